@@ -0,0 +1,52 @@
+"""
+Per-step cost of preparing the model in an agent step, before and after memoizing
+tool bindings and structured output wrappers. No model is called.
+
+    uv run python -m benchmarks.bind_tools
+"""
+
+import os
+import timeit
+
+os.environ.setdefault("SERPER_API_KEY", "benchmark")
+
+from globals import app_state  # noqa: E402
+from graphs.planner import Plan, TOOLS_MAP as PLANNER_TOOLS  # noqa: E402
+from graphs.self_heal import TOOLS_MAP as HEAL_TOOLS  # noqa: E402
+from graphs.task import TOOLS_MAP as TASK_TOOLS  # noqa: E402
+
+
+def per_call_ms(fn, number: int) -> float:
+    return timeit.timeit(fn, number=number) / number * 1000
+
+
+def main(number: int = 200):
+    cases = {
+        "planner bind_tools": (
+            lambda: app_state.model.bind_tools(list(PLANNER_TOOLS.values())),
+            lambda: app_state.bind_tools(list(PLANNER_TOOLS.values())),
+        ),
+        "task bind_tools": (
+            lambda: app_state.model.bind_tools(list(TASK_TOOLS.values())),
+            lambda: app_state.bind_tools(list(TASK_TOOLS.values())),
+        ),
+        "healer bind_tools": (
+            lambda: app_state.model.bind_tools(list(HEAL_TOOLS.values())),
+            lambda: app_state.bind_tools(list(HEAL_TOOLS.values())),
+        ),
+        "with_structured_output(Plan)": (
+            lambda: app_state.model.with_structured_output(Plan),
+            lambda: app_state.with_structured_output(Plan),
+        ),
+    }
+
+    print(f"{'step':<32}{'rebuilt (ms)':>14}{'memoized (ms)':>15}{'speedup':>10}")
+    for name, (rebuilt, memoized) in cases.items():
+        before = per_call_ms(rebuilt, number)
+        memoized()
+        after = per_call_ms(memoized, number)
+        print(f"{name:<32}{before:>14.3f}{after:>15.4f}{before / after:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,25 @@
 from langchain_community.utilities import GoogleSerperAPIWrapper
 from langchain_ollama import ChatOllama
 from dotenv import load_dotenv
+from langchain_core.globals import set_llm_cache
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable
+from langchain_core.tools import BaseTool
+from lib.search_cache import SearchCache
+from lib.llm_cache import BoundedSQLiteCache
+from lib.fix_memory import FixMemory
 from threading import Lock
+from contextlib import contextmanager
+from contextvars import ContextVar
+import os
 
 load_dotenv()
 
+# Shared on-disk state (scaffold templates, caches) that outlives individual projects
+CACHE_DIR = os.getenv(
+    "UNLOVABLE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "unlovable")
+)
+
 
 class GlobalState:
     _instance: "GlobalState | None" = None
@@ -23,10 +38,84 @@ class GlobalState:
         self._initialized = True
 
         self._lock = Lock()
-        self.current_project: str = ""
+        self.task_workers: int = int(os.getenv("UNLOVABLE_TASK_WORKERS", "4"))
+        self.tool_workers: int = int(os.getenv("UNLOVABLE_TOOL_WORKERS", "8"))
+
+        # opt-in: identical prompts to the same model/tool binding are answered from disk
+        self.llm_cache: BoundedSQLiteCache | None = None
+        if os.getenv("UNLOVABLE_LLM_CACHE", "").lower() in ("1", "true", "yes"):
+            self.llm_cache = BoundedSQLiteCache(
+                os.path.join(CACHE_DIR, "llm.sqlite"),
+                max_entries=int(os.getenv("UNLOVABLE_LLM_CACHE_SIZE", "20000")),
+            )
+            set_llm_cache(self.llm_cache)
+
+        # patches that fixed recurring check failures, replayed before asking the healer
+        self.fix_memory: FixMemory | None = None
+        if os.getenv("UNLOVABLE_FIX_MEMORY", "1").lower() not in ("0", "false", "no"):
+            self.fix_memory = FixMemory(
+                os.path.join(CACHE_DIR, "fixes.sqlite"),
+                max_entries=int(os.getenv("UNLOVABLE_FIX_MEMORY_SIZE", "2000")),
+            )
 
         self.model = ChatOllama(model="llama3.1:8b", temperature=0)
+        # (kind, model id, tools or schema) -> bound runnable, cleared by set_model
+        self._bindings: dict[tuple, Runnable] = {}
         self.serper = GoogleSerperAPIWrapper()
+        self.search = SearchCache(
+            self.serper,
+            path=os.path.join(CACHE_DIR, "search.sqlite"),
+            ttl=float(os.getenv("UNLOVABLE_SEARCH_TTL", str(7 * 24 * 3600))),
+            max_entries=int(os.getenv("UNLOVABLE_SEARCH_CACHE_SIZE", "5000")),
+        )
+
+    def set_model(self, model: BaseChatModel) -> None:
+        with self._lock:
+            self.model = model
+            self._bindings.clear()
+
+    def _binding(self, key: tuple, build) -> Runnable:
+        with self._lock:
+            model = self.model
+            key = (id(model),) + key
+            if key not in self._bindings:
+                self._bindings[key] = build(model)
+            return self._bindings[key]
+
+    def bind_tools(self, tools: list[BaseTool]) -> Runnable:
+        """The current model with tools bound, built once per (model, tool set)."""
+        return self._binding(
+            ("tools", tuple(tool.name for tool in tools)),
+            lambda model: model.bind_tools(tools),
+        )
+
+    def with_structured_output(self, schema: type) -> Runnable:
+        """The current model with structured output for schema, built once per (model, schema)."""
+        return self._binding(
+            ("structured", schema),
+            lambda model: model.with_structured_output(schema),
+        )
 
 
 app_state = GlobalState()
+
+# Each generation job runs with its own project path. Threads started for a job must
+# copy the context (contextvars.copy_context().run) so tools see the right project.
+_current_project: ContextVar[str] = ContextVar("current_project")
+
+
+def current_project() -> str:
+    """Path of the project the running job is working on."""
+    try:
+        return _current_project.get()
+    except LookupError:
+        raise RuntimeError("No project is active in this context")
+
+
+@contextmanager
+def use_project(path: str):
+    token = _current_project.set(path)
+    try:
+        yield path
+    finally:
+        _current_project.reset(token)
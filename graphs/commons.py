@@ -5,6 +5,29 @@ from langgraph.graph import StateGraph, START
 from langgraph.prebuilt import tools_condition
 from operator import add
 from globals import app_state
+from graphs.compaction import compact_messages
+from lib.scheduler import paths_overlap, run_scheduled
+
+# project paths a tool call reads and writes, used to decide which calls of one turn may
+# run at the same time. "" means the whole project; unknown tools get the whole project.
+TOOL_RESOURCES = {
+    "search_internet": lambda args: ([], []),
+    "read_project_file": lambda args: ([args.get("rel_path", "")], []),
+    "ls": lambda args: ([args.get("rel_path", "")], []),
+    "tree": lambda args: ([args.get("rel_path", "")], []),
+    "grep": lambda args: ([args.get("rel_path", "")], []),
+    "find_symbol": lambda args: ([""], []),
+    "who_imports": lambda args: ([""], []),
+    "write_project_file": lambda args: ([], [args.get("rel_path", "")]),
+    "move": lambda args: ([], [""]),
+    "install_dependencies": lambda args: ([], ["package.json"]),
+    "install_dev_dependencies": lambda args: ([], ["package.json"]),
+    "remove_dependencies": lambda args: ([], ["package.json"]),
+    "remove_dev_dependencies": lambda args: ([], ["package.json"]),
+    "type_check": lambda args: ([""], []),
+    "next_lint": lambda args: ([""], []),
+    "npx_run": lambda args: ([], [""]),
+}
 
 
 class AgentState(TypedDict):
@@ -12,6 +35,49 @@ class AgentState(TypedDict):
     carry: str
 
 
+def tool_resources(tool_call: dict) -> tuple[list[str], list[str]]:
+    resources = TOOL_RESOURCES.get(tool_call["name"], lambda args: ([], [""]))
+    return resources(tool_call.get("args", {}))
+
+
+def tool_calls_conflict(a: dict, b: dict) -> bool:
+    """Two tool calls conflict when either one writes a path the other reads or writes."""
+    a_reads, a_writes = tool_resources(a)
+    b_reads, b_writes = tool_resources(b)
+    return any(
+        paths_overlap(w, p) for w in a_writes for p in b_reads + b_writes
+    ) or any(paths_overlap(w, p) for w in b_writes for p in a_reads)
+
+
+def run_tool_calls(
+    tool_calls: list[dict], tool_map: dict[str, BaseTool]
+) -> list[ToolMessage]:
+    """
+    Runs the tool calls of one model turn on up to app_state.tool_workers threads.
+    Reads and searches run together, while calls writing the same path, dependency
+    changes and whole-project tools keep their call order. Messages come back in call order.
+    """
+
+    def call(tool_call: dict) -> ToolMessage:
+        tool_name = tool_call["name"]
+        tool = tool_map.get(tool_name)
+        try:
+            result = (
+                tool.invoke(tool_call.get("args", {}))
+                if tool
+                else f"Error: Tool '{tool_name}' not found"
+            )
+        except Exception as e:
+            result = f"Tool '{tool_name}' crashed: {str(e)}"
+        return ToolMessage(content=str(result), tool_call_id=tool_call["id"])
+
+    if len(tool_calls) == 1:
+        return [call(tool_calls[0])]
+    return run_scheduled(
+        tool_calls, call, tool_calls_conflict, max_workers=app_state.tool_workers
+    )
+
+
 def build_simple_tool_graph(
     system_prompt: str, tool_map: dict[str, BaseTool], name: str = "agent"
 ):
@@ -20,15 +86,19 @@ def build_simple_tool_graph(
     Invoke ONLY with:
         .invoke({"messages": [HumanMessage(content="your task here")]})
 
-    state["carry"] maintains a brief compounding summary of tasks performed.
+    state["carry"] holds the change ledger entries relevant to this run (see lib.ledger)
+    and is appended to the system prompt.
     """
 
     def agent(state: AgentState):
         messages = state["messages"]
         if not messages or not isinstance(messages[0], SystemMessage):
-            messages = [SystemMessage(content=system_prompt)] + messages
-        model_with_tools = app_state.model.bind_tools(list(tool_map.values()))
-        response = model_with_tools.invoke(messages)
+            prompt = system_prompt
+            if state.get("carry"):
+                prompt += f"\n### CHANGE LEDGER\n{state['carry']}\n"
+            messages = [SystemMessage(content=prompt)] + messages
+        model_with_tools = app_state.bind_tools(list(tool_map.values()))
+        response = model_with_tools.invoke(compact_messages(messages))
 
         return {"messages": [response]}
 
@@ -37,23 +107,7 @@ def build_simple_tool_graph(
         if not getattr(last_msg, "tool_calls", None) or not last_msg.tool_calls:
             return {"messages": []}
 
-        tool_messages = []
-        for tc in last_msg.tool_calls:
-            tool_name = tc["name"]
-            tool_args = tc.get("args", {})
-            tool_id = tc["id"]
-            tool = tool_map.get(tool_name)
-            try:
-                result = (
-                    tool.invoke(tool_args)
-                    if tool
-                    else f"Error: Tool '{tool_name}' not found"
-                )
-            except Exception as e:
-                result = f"Tool '{tool_name}' crashed: {str(e)}"
-            tool_messages.append(ToolMessage(content=str(result), tool_call_id=tool_id))
-
-        return {"messages": tool_messages}
+        return {"messages": run_tool_calls(last_msg.tool_calls, tool_map)}
 
     graph = StateGraph(AgentState)
     graph.add_node("agent", agent)
@@ -0,0 +1,108 @@
+import os
+from threading import Lock
+from langchain_core.messages import AIMessage, AnyMessage, ToolMessage
+
+CONTEXT_BUDGET = int(os.getenv("UNLOVABLE_CONTEXT_BUDGET", "8000"))
+# the most recent messages are always sent verbatim
+KEEP_RECENT = 6
+TRUNCATE_TO = 1500
+
+_stats = {"compactions": 0, "tokens_before": 0, "tokens_after": 0}
+_stats_lock = Lock()
+
+
+def estimate_tokens(messages: list[AnyMessage]) -> int:
+    """Rough token count (~4 characters per token) so no tokenizer is needed."""
+    chars = 0
+    for message in messages:
+        chars += len(str(message.content))
+        for tool_call in getattr(message, "tool_calls", None) or []:
+            chars += len(str(tool_call.get("args", {})))
+    return chars // 4
+
+
+def _truncate(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    half = limit // 2
+    return f"{text[:half]}\n... [{len(text) - limit} characters omitted] ...\n{text[-half:]}"
+
+
+def _rel_path(tool_call: dict) -> str:
+    # the file tools accept paths with or without the leading /
+    return str(tool_call.get("args", {}).get("rel_path") or "").strip().lstrip("/")
+
+
+def compact_messages(
+    messages: list[AnyMessage], budget: int = CONTEXT_BUDGET
+) -> list[AnyMessage]:
+    """
+    Returns a copy of messages that fits budget tokens where possible, for sending to the model.
+    The state itself is left untouched. System and human messages and the last KEEP_RECENT
+    messages stay verbatim. Older tool results are shrunk in order of how safe that is:
+    reads of files that were later rewritten are dropped, long outputs and written file
+    contents are truncated, and finally old tool results are omitted oldest first.
+    Tool messages are never removed, so every tool call keeps its result.
+    """
+    before = estimate_tokens(messages)
+    if before <= budget:
+        return messages
+
+    compacted = list(messages)
+    old = range(max(0, len(compacted) - KEEP_RECENT))
+    calls = {
+        tool_call["id"]: (index, tool_call)
+        for index, message in enumerate(compacted)
+        if isinstance(message, AIMessage)
+        for tool_call in message.tool_calls
+    }
+    last_write = {}
+    for index, tool_call in calls.values():
+        if tool_call["name"] == "write_project_file":
+            path = _rel_path(tool_call)
+            last_write[path] = max(index, last_write.get(path, -1))
+
+    for i in old:
+        message = compacted[i]
+        if isinstance(message, ToolMessage):
+            index, tool_call = calls.get(message.tool_call_id, (i, {}))
+            path = _rel_path(tool_call)
+            if (
+                tool_call.get("name") == "read_project_file"
+                and last_write.get(path, -1) > index
+            ):
+                content = f"[read of /{path} omitted: the file was rewritten later]"
+            else:
+                content = _truncate(str(message.content), TRUNCATE_TO)
+            compacted[i] = message.model_copy(update={"content": content})
+        elif isinstance(message, AIMessage) and message.tool_calls:
+            tool_calls = []
+            for tool_call in message.tool_calls:
+                args = dict(tool_call.get("args", {}))
+                if isinstance(args.get("content"), str):
+                    args["content"] = _truncate(args["content"], TRUNCATE_TO)
+                tool_calls.append({**tool_call, "args": args})
+            compacted[i] = message.model_copy(update={"tool_calls": tool_calls})
+
+    for i in old:
+        if estimate_tokens(compacted) <= budget:
+            break
+        if isinstance(compacted[i], ToolMessage):
+            compacted[i] = compacted[i].model_copy(
+                update={"content": "[tool result omitted to fit the context budget]"}
+            )
+
+    after = estimate_tokens(compacted)
+    with _stats_lock:
+        _stats["compactions"] += 1
+        _stats["tokens_before"] += before
+        _stats["tokens_after"] += after
+    return compacted
+
+
+def compaction_stats() -> dict[str, int]:
+    with _stats_lock:
+        return {
+            **_stats,
+            "tokens_saved": _stats["tokens_before"] - _stats["tokens_after"],
+        }
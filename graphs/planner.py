@@ -1,13 +1,13 @@
-from langchain_core.messages import AnyMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages import AnyMessage, HumanMessage, SystemMessage
 from langgraph.graph import StateGraph, START, END
 from graphs.tools import search_internet
-from globals import app_state
+from graphs.compaction import compact_messages
+from graphs.commons import run_tool_calls
+from globals import app_state, current_project
+from lib.prompts import read_prompts
 from pydantic import BaseModel, Field
-from typing import TypedDict, Literal, Annotated
+from typing import TypedDict, Literal, Annotated, NotRequired
 from operator import add
-from langchain_core.runnables import RunnableLambda
-import os
-import logging
 
 PLANNER_SYSTEM_MESSAGE = """
 You are an expert Next.js 14+ architect working on an already existing project that was created with:
@@ -51,8 +51,34 @@ Output only the exhaustive, numbered task list with exact file paths and precise
 TOOLS_MAP = {"search_internet": search_internet}
 
 
+class PlanTask(BaseModel):
+    description: str = Field(description="Single short sentence describing WHAT to do.")
+
+    reads: list[str] = Field(
+        default_factory=list,
+        description="""
+        Project paths (files or directories, relative to the project root) this task
+        reads but does not change, e.g. src/app/layout.tsx, src/components/, src/lib/utils.ts
+        """,
+    )
+
+    writes: list[str] = Field(
+        default_factory=list,
+        description="""
+        Project paths (files or directories, relative to the project root) this task
+        creates or modifies, e.g. src/app/about/, src/components/Navbar.tsx.
+        Include package.json when the task installs or removes dependencies.
+        Tasks whose writes do not overlap with each other's reads or writes may run at the same time.
+        """,
+    )
+
+    class Config:
+        extra = "forbid"
+        str_strip_whitespace = True
+
+
 class Plan(BaseModel):
-    common_tasks: list[str] = Field(
+    common_tasks: list[PlanTask] = Field(
         description="""
         Atomic, ordered tasks that affect shared configuration or global files and must be done first 
         so that every subsequent task can succeed without breaking the build at any point.
@@ -71,7 +97,7 @@ class Plan(BaseModel):
         """
     )
 
-    backend_tasks: list[str] = Field(
+    backend_tasks: list[PlanTask] = Field(
         description="""
         Pure backend / data-layer tasks that do not affect visible UI directly.
         Must use app router conventions (route.ts, server actions, server components).
@@ -87,10 +113,11 @@ class Plan(BaseModel):
         """
     )
 
-    frontend_tasks: list[str] = Field(
+    frontend_tasks: list[PlanTask] = Field(
         description="""
         Purely frontend / route-specific UI tasks that implement pages, layouts, and client components.
-        Executed only after all common_tasks and backend_tasks are complete.
+        Executed only after all common_tasks are complete, alongside backend_tasks;
+        list any backend files a task depends on in its reads so it waits for them.
         Must follow exact file locations:
         - New pages → src/app/[route]/page.tsx (server component by default)
         - Client components → src/components/ or src/app/[route]/components/ with 'use client'
@@ -110,59 +137,52 @@ class Plan(BaseModel):
 class PlannerState(TypedDict):
     messages: Annotated[list[AnyMessage], add]
     plan: Plan | None
+    # routes to re-plan in an incremental run; None (or absent) plans the whole site
+    routes: NotRequired[list[str] | None]
+
+
+INCREMENTAL_MESSAGE = """
+This site was generated before and its routes are already implemented.
+Only the prompts of these routes changed since then: {changed}.
+Plan tasks ONLY for these routes and leave every other route ({unchanged}) exactly as it is.
+Leave common_tasks empty unless the / prompt changed.
+For a route whose prompt was deleted, plan replacing its page with a call to notFound() and removing links to it.
+"""
 
 
 def read_prompts_node(state: PlannerState) -> dict:
     """First node that reads prompts from the project path and initializes messages."""
     messages: list[AnyMessage] = [SystemMessage(content=PLANNER_SYSTEM_MESSAGE)]
-    root_path = f"{app_state.current_project}/prompts/index.txt"
-    if os.path.exists(root_path):
-        with open(root_path, "r", encoding="utf-8") as root_prompt:
-            content = root_prompt.read().strip()
-            if content:
-                messages.append(HumanMessage(content=f"/: -\n\n{content}"))
-
-    def recursive_read_prompts(prompt_path: str) -> None:
-        if not os.path.exists(prompt_path):
-            return
-        try:
-            for entry in os.listdir(prompt_path):
-                full_path = os.path.join(prompt_path, entry)
-                if os.path.isdir(full_path):
-                    recursive_read_prompts(full_path)
-                elif entry == "index.txt":
-                    with open(full_path, "r", encoding="utf-8") as prompt:
-                        content = prompt.read().strip()
-                        if content:
-                            relative_path = os.path.relpath(
-                                full_path, f"{app_state.current_project}/prompts"
-                            ).replace(os.sep, "/")
-                            if relative_path.endswith("/index.txt"):
-                                relative_path = relative_path[:-10]
-                            elif relative_path == "index.txt":
-                                relative_path = "/"
-                            else:
-                                relative_path = "/" + relative_path
-
-                            if not relative_path.startswith("/"):
-                                relative_path = "/" + relative_path
-
-                            messages.append(
-                                HumanMessage(content=f"{relative_path}: -\n\n{content}")
-                            )
-        except Exception as e:
-            logging.error(f"Error while reading prompts: {str(e)}")
-
-    recursive_read_prompts(f"{app_state.current_project}/prompts/")
-
+    prompts = read_prompts(current_project())
+    routes = state.get("routes")
+    if routes is None:
+        for route, content in prompts.items():
+            messages.append(HumanMessage(content=f"{route}: -\n\n{content}"))
+        return {"messages": messages}
+
+    unchanged = [route for route in prompts if route not in routes]
+    messages.append(
+        HumanMessage(
+            content=INCREMENTAL_MESSAGE.format(
+                changed=", ".join(routes), unchanged=", ".join(unchanged) or "none"
+            )
+        )
+    )
+    if "/" in prompts and "/" not in routes:
+        messages.append(
+            HumanMessage(content=f"/ (unchanged, for context): -\n\n{prompts['/']}")
+        )
+    for route in routes:
+        content = prompts.get(route, "[prompt deleted]")
+        messages.append(HumanMessage(content=f"{route}: -\n\n{content}"))
     return {"messages": messages}
 
 
 def planner_node(state: PlannerState) -> dict:
     """Planner node that calls LLM with tools bound."""
     messages = state["messages"]
-    model_with_tools = app_state.model.bind_tools(list(TOOLS_MAP.values()))
-    response = model_with_tools.invoke(messages)
+    model_with_tools = app_state.bind_tools(list(TOOLS_MAP.values()))
+    response = model_with_tools.invoke(compact_messages(messages))
     return {"messages": [response]}
 
 
@@ -170,36 +190,24 @@ def tools_node(state: PlannerState) -> dict:
     """Tools execution node."""
     messages = state["messages"]
     last_message = messages[-1]
-    tool_messages = []
     if not hasattr(last_message, "tool_calls") or not last_message.tool_calls:
         return {"messages": []}
-    for tool_call in last_message.tool_calls:
-        tool_name = tool_call["name"]
-        tool_args = tool_call.get("args", {})
-        tool_id = tool_call["id"]
-        if tool_name not in TOOLS_MAP:
-            result = f"Error: Tool '{tool_name}' not found in tool_map"
-        else:
-            try:
-                result = TOOLS_MAP[tool_name].invoke(tool_args)
-            except Exception as e:
-                result = f"Tool execution error: {str(e)}"
-        tool_messages.append(ToolMessage(content=str(result), tool_call_id=tool_id))
-    return {"messages": tool_messages}
+    return {"messages": run_tool_calls(last_message.tool_calls, TOOLS_MAP)}
 
 
 def finalize_plan_node(state: PlannerState) -> dict:
-    structured_llm = app_state.model.with_structured_output(Plan)
+    structured_llm = app_state.with_structured_output(Plan)
     final_messages = state["messages"] + [
         HumanMessage(
             content=(
                 "OUTPUT EXACTLY AS PER THE SCHEMA\n"
-                "Each entry must be a single short sentence describing WHAT to do. "
-                "Do NOT include prefixes like 'description:', 'name:'"
+                "Each description must be a single short sentence describing WHAT to do. "
+                "Do NOT include prefixes like 'description:', 'name:'. "
+                "List every file or directory each task reads in 'reads' and every one it creates or modifies in 'writes'."
             )
         )
     ]
-    plan: Plan = structured_llm.invoke(final_messages)
+    plan: Plan = structured_llm.invoke(compact_messages(final_messages))
     return {"plan": plan}
 
 
@@ -227,7 +235,3 @@ workflow.add_edge("tools", "planner")
 workflow.add_edge("finalize_plan", END)
 
 planner_graph = workflow.compile()
-
-planner = RunnableLambda(
-    lambda input_dict: planner_graph.invoke({"messages": [], "plan": None})["plan"]
-).with_types(input_type=dict, output_type=Plan)
@@ -1,10 +1,22 @@
 from langchain.tools import tool
-from globals import app_state
+from globals import app_state, current_project
+from lib.dependencies import dependency_queue
+from lib.ledger import project_ledger
+from lib.journal import move_path, write_file
+from lib.read_cache import DEFAULT_MAX_BYTES, read_lines
+from lib.project_index import MAX_TREE_ENTRIES, project_index, update_index
+from lib.checkers import (
+    format_lint,
+    get_lint_worker,
+    get_type_checker,
+    notify_write,
+    take_changed_for_lint,
+)
 from json import load as json_load
 import subprocess
 import os
+import re
 import logging
-import shutil
 
 
 @tool
@@ -12,7 +24,7 @@ def search_internet(query: str) -> str:
     """
     Search the internet for any query and receive a string response.
     """
-    return app_state.serper.run(query)
+    return app_state.search.run(query)
 
 
 @tool
@@ -22,7 +34,7 @@ def list_dependencies() -> dict[str, list[str]] | str:
     """
 
     try:
-        with open(f"{app_state.current_project}/package.json") as file:
+        with open(f"{current_project()}/package.json") as file:
             package_json = json_load(file)
     except Exception as e:
         return f"Failed to read package.json with error: {str(e)}"
@@ -34,110 +46,57 @@ def list_dependencies() -> dict[str, list[str]] | str:
 
 
 @tool
-def install_dependencies(package_names: list[str]) -> str | None:
+def install_dependencies(package_names: list[str]) -> str:
     """
-    Installs npm packages to the current NextJS project given npm package names.
+    Queues npm packages to be installed to the current NextJS project given npm package names (optionally name@version).
+    Queued packages are installed together at the end of the current phase.
     """
-    try:
-        npm_i_out = subprocess.run(
-            f"npm i {' '.join(package_names)}",
-            capture_output=True,
-            text=True,
-            cwd=app_state.current_project,
-            check=True,
-            shell=True,
-        )
-        return f"Successfully installed packages: {', '.join(package_names)}\n{npm_i_out.stdout}"
-    except subprocess.CalledProcessError as e:
-        error_msg = e.stderr or e.stdout or "Unknown error"
-        return (
-            f"Error installing packages: {', '.join(package_names)}\nError: {error_msg}"
-        )
-    except Exception as e:
-        return f"Unexpected error installing packages: {str(e)}"
+    return dependency_queue(current_project()).queue("install", package_names, False)
 
 
 @tool
-def install_dev_dependencies(package_names: list[str]) -> str | None:
+def install_dev_dependencies(package_names: list[str]) -> str:
     """
-    Installs npm development packages to the current NextJS project given npm package names.
+    Queues npm development packages to be installed to the current NextJS project given npm package names (optionally name@version).
+    Queued packages are installed together at the end of the current phase.
     """
-    try:
-        npm_i_d_out = subprocess.run(
-            f"npm i -D {' '.join(package_names)}",
-            capture_output=True,
-            text=True,
-            cwd=app_state.current_project,
-            check=True,
-            shell=True,
-        )
-        return f"Successfully installed dev packages: {', '.join(package_names)}\n{npm_i_d_out.stdout}"
-    except subprocess.CalledProcessError as e:
-        error_msg = e.stderr or e.stdout or "Unknown error"
-        return f"Error installing dev packages: {', '.join(package_names)}\nError: {error_msg}"
-    except Exception as e:
-        return f"Unexpected error installing dev packages: {str(e)}"
+    return dependency_queue(current_project()).queue("install", package_names, True)
 
 
 @tool
-def remove_dependencies(package_names: list[str]) -> str | None:
+def remove_dependencies(package_names: list[str]) -> str:
     """
-    Removes npm packages currently installed on the NextJS project given npm package names.
+    Queues removal of npm packages currently installed on the NextJS project given npm package names.
     """
-    try:
-        npm_rm_out = subprocess.run(
-            f"npm rm {' '.join(package_names)}",
-            capture_output=True,
-            text=True,
-            cwd=app_state.current_project,
-            check=True,
-            shell=True,
-        )
-        return f"Successfully removed packages: {', '.join(package_names)}\n{npm_rm_out.stdout}"
-    except subprocess.CalledProcessError as e:
-        error_msg = e.stderr or e.stdout or "Unknown error"
-        return (
-            f"Error removing packages: {', '.join(package_names)}\nError: {error_msg}"
-        )
-    except Exception as e:
-        return f"Unexpected error removing packages: {str(e)}"
+    return dependency_queue(current_project()).queue("remove", package_names, False)
 
 
 @tool
-def remove_dev_dependencies(package_names: list[str]) -> str | None:
+def remove_dev_dependencies(package_names: list[str]) -> str:
     """
-    Removes npm development packages currently installed on the NextJS project given npm package names.
+    Queues removal of npm development packages currently installed on the NextJS project given npm package names.
     """
-    try:
-        npm_rm_d_out = subprocess.run(
-            f"npm rm -D {' '.join(package_names)}",
-            capture_output=True,
-            text=True,
-            cwd=app_state.current_project,
-            check=True,
-            shell=True,
-        )
-        return f"Successfully removed dev packages: {', '.join(package_names)}\n{npm_rm_d_out.stdout}"
-    except subprocess.CalledProcessError as e:
-        error_msg = e.stderr or e.stdout or "Unknown error"
-        return f"Error removing dev packages: {', '.join(package_names)}\nError: {error_msg}"
-    except Exception as e:
-        return f"Unexpected error removing dev packages: {str(e)}"
+    return dependency_queue(current_project()).queue("remove", package_names, True)
 
 
 @tool
-def read_project_file(rel_path: str) -> str:
+def read_project_file(
+    rel_path: str,
+    start_line: int = 1,
+    end_line: int | None = None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> str:
     """
     Reads any file in the project given a file path where / is the project root (e.g., /src, /tsconfig.json).
+    Optionally reads only lines start_line to end_line (1-based, inclusive). Output longer than max_bytes is truncated with a notice saying which start_line to read on from.
     """
     if rel_path == "/package.json" or rel_path == "/package-lock.json":
         return "Wrong tool"
     try:
-        full_path = os.path.join(app_state.current_project, rel_path.lstrip("/"))
+        full_path = os.path.join(current_project(), rel_path.lstrip("/"))
         if not os.path.exists(full_path):
             return "File does not exist"
-        with open(full_path, "r") as file:
-            return file.read()
+        return read_lines(full_path, start_line, end_line, max_bytes)
     except Exception as e:
         logging.error(f"Reading from file {full_path} failed with: {str(e)}")
         return f"Reading from file {full_path} failed with: {str(e)}"
@@ -151,10 +110,12 @@ def write_project_file(rel_path: str, content: str) -> str | None:
     if rel_path == "/package.json" or rel_path == "/package-lock.json":
         return "Cannot modify npm packages directly"
     try:
-        full_path = os.path.join(app_state.current_project, rel_path.lstrip("/"))
-        os.makedirs(os.path.dirname(full_path), exist_ok=True)
-        with open(full_path, "w") as file:
-            file.write(content)
+        full_path = os.path.join(current_project(), rel_path.lstrip("/"))
+        created = not os.path.exists(full_path)
+        write_file(current_project(), rel_path, content)
+        notify_write(current_project(), rel_path)
+        project_ledger(current_project()).record_write(rel_path, content, created)
+        update_index(current_project(), [rel_path])
         logging.info(f"Wrote to file: {full_path}")
         return "Write successful"
     except Exception as e:
@@ -167,7 +128,65 @@ def ls(rel_path: str) -> list[str]:
     """
     Lists files and subdirectories in a project given a relative path where / is the project root (e.g., /src, /tsconfig.json).
     """
-    return os.listdir(os.path.join(app_state.current_project, rel_path.lstrip("/")))
+    return os.listdir(os.path.join(current_project(), rel_path.lstrip("/")))
+
+
+@tool
+def tree(rel_path: str = "/", depth: int = 3) -> str:
+    """
+    Lists the project's files and directories under a path where / is the project root, down to depth levels, in one call. Pages and route handlers under src/app are marked with the URL route they serve. node_modules and .next are left out.
+    """
+    lines = project_index(current_project()).tree(rel_path, depth)
+    if not lines:
+        return "No files under this path"
+    if len(lines) > MAX_TREE_ENTRIES:
+        return "\n".join(lines[:MAX_TREE_ENTRIES]) + (
+            f"\n[Truncated at {MAX_TREE_ENTRIES} entries: call tree on a subdirectory or with a smaller depth]"
+        )
+    return "\n".join(lines)
+
+
+@tool
+def find_symbol(name: str) -> str:
+    """
+    Finds which project files export a component, function, type or constant given its name (e.g., Navbar, formatDate). Falls back to partial name matches.
+    """
+    matches = project_index(current_project()).find_symbol(name)
+    if not matches:
+        return f"No project file exports {name}"
+    return "\n".join(f"{path}: {symbol}" for path, symbol in matches)
+
+
+@tool
+def who_imports(target: str) -> str:
+    """
+    Lists the project files that import a module given its path where / is the project root (e.g., /src/components/Navbar.tsx, /src/lib/utils) or an npm package name (e.g., framer-motion).
+    """
+    importers = project_index(current_project()).who_imports(target)
+    if not importers:
+        return f"Nothing imports {target}"
+    return "\n".join(importers)
+
+
+@tool
+def grep(pattern: str, rel_path: str = "/", max_results: int = 50) -> str:
+    """
+    Searches project files under a path where / is the project root for lines matching a regular expression, returning path:line: text for each match.
+    """
+    try:
+        compiled = re.compile(pattern)
+    except re.error as e:
+        return f"Invalid pattern: {str(e)}"
+    matches, more = project_index(current_project()).grep(
+        compiled, rel_path, max_results
+    )
+    if not matches:
+        return "No matches"
+    if more:
+        matches.append(
+            f"[Truncated at {max_results} matches: narrow the pattern or rel_path]"
+        )
+    return "\n".join(matches)
 
 
 @tool
@@ -175,55 +194,69 @@ def move(rel_path: str, dest_rel_path: str) -> str | None:
     """
     Moves a directory or a file into another directory given a relative path where / is the project root (e.g., /src, /tsconfig.json).
     """
-    full_path = os.path.join(app_state.current_project, rel_path.lstrip("/"))
+    full_path = os.path.join(current_project(), rel_path.lstrip("/"))
 
     if not os.path.exists(full_path):
         return "Source path is invalid"
 
-    dest_full_path = os.path.join(app_state.current_project, rel_path.lstrip("/"))
+    if dest_rel_path in ("/package.json", "/package-lock.json"):
+        return "Cannot modify npm packages directly"
     try:
-        if input(f"Move {full_path} to {dest_full_path} (y/n)?").lower() != "n":
-            shutil.move(full_path, dest_full_path)
+        move_path(current_project(), rel_path, dest_rel_path)
+        notify_write(current_project(), rel_path)
+        notify_write(current_project(), dest_rel_path)
+        project_ledger(current_project()).record_move(rel_path, dest_rel_path)
+        update_index(current_project(), [rel_path, dest_rel_path])
+        logging.info(f"Moved {full_path} to {dest_rel_path}")
+        return "Move successful"
     except Exception as e:
         return f"Move failed with: {str(e)}"
 
 
 @tool
-def type_check() -> str:
+def type_check(rel_paths: list[str] | None = None) -> str:
     """
-    Runs tsc --noEmit on the current project and gives the output
+    Type-checks the current project with a persistent incremental tsc and gives the diagnostics.
+    Optionally pass file paths where / is the project root (e.g., /src/app/page.tsx) to only see their diagnostics.
     """
     try:
-        tsc_out = subprocess.run(
-            "tsc --noEmit",
-            capture_output=True,
-            text=True,
-            cwd=app_state.current_project,
-            shell=True,
-            check=True,
+        error_count, diagnostics = get_type_checker(current_project()).check()
+    except Exception as e:
+        return f"Type check failed with: {str(e)}"
+
+    if rel_paths:
+        wanted = tuple(path.lstrip("/") for path in rel_paths)
+        diagnostics = [line for line in diagnostics if line.startswith(wanted)]
+    if not diagnostics:
+        return (
+            f"No errors in the requested files ({error_count} in the project)"
+            if rel_paths and error_count
+            else "No errors"
         )
-        return tsc_out.stdout or tsc_out.stdout or "No output"
-    except subprocess.CalledProcessError as e:
-        return e.stderr or e.stdout or "Unknown error"
+    return "\n".join(diagnostics) + f"\n\nFound {error_count} errors in the project"
 
 
 @tool
-def next_lint() -> str:
+def next_lint(rel_paths: list[str] | None = None, full: bool = False) -> str:
     """
-    Runs next lint on the current project and gives the output
+    Lints project files with a resident ESLint worker and gives the output.
+    By default lints only the files written since the last lint call. Pass file paths where / is the project root
+    (e.g., /src/app/page.tsx) to lint specific files, or full=True to lint the whole project.
     """
+    project = current_project()
+    if full:
+        files = []
+    elif rel_paths:
+        files = [path.lstrip("/") for path in rel_paths]
+    else:
+        files = take_changed_for_lint(project)
+        if not files:
+            return "No files changed since the last lint"
+
     try:
-        tsc_out = subprocess.run(
-            "next lint",
-            capture_output=True,
-            text=True,
-            cwd=app_state.current_project,
-            shell=True,
-            check=True,
-        )
-        return tsc_out.stdout or tsc_out.stdout or "No output"
-    except subprocess.CalledProcessError as e:
-        return e.stderr or e.stdout or "Unknown error"
+        return format_lint(get_lint_worker(project).lint(files))
+    except Exception as e:
+        return f"Lint failed with: {str(e)}"
 
 
 @tool
@@ -236,7 +269,7 @@ def npx_run(command: str, args: list[str]) -> str:
             f"npx {command} {' '.join(args)}",
             capture_output=True,
             text=True,
-            cwd=app_state.current_project,
+            cwd=current_project(),
             shell=True,
             check=True,
         )
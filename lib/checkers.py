@@ -0,0 +1,302 @@
+import json
+import logging
+import os
+import platform
+import re
+import signal
+import subprocess
+import time
+from collections import deque
+from threading import Condition, Lock, Thread
+from lib.journal import current_journal
+
+TS_EXTENSIONS = (".ts", ".tsx", ".mts", ".cts", ".js", ".jsx", ".mjs", ".json")
+LINT_EXTENSIONS = (".ts", ".tsx", ".mts", ".cts", ".js", ".jsx", ".mjs", ".cjs")
+ESLINT_WORKER = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "eslint_worker.mjs"
+)
+
+# tsc --watch prints one of these at the start and the end of every compile
+CYCLE_START_RE = re.compile(
+    r"Starting compilation in watch mode|File change detected\. Starting incremental compilation"
+)
+CYCLE_END_RE = re.compile(r"Found (\d+) errors?\b")
+
+# tsc waits ~250ms after a change before recompiling. If nothing has started after this
+# long the written file is not part of the program and the last result still holds.
+RECOMPILE_GRACE = 2.0
+
+
+def kill_process_group(proc: subprocess.Popen) -> None:
+    if proc.poll() is not None:
+        return
+    try:
+        if platform.system() != "Windows":
+            os.killpg(os.getpgid(proc.pid), signal.SIGTERM)
+        else:
+            proc.terminate()
+        proc.wait(timeout=5)
+    except Exception:
+        proc.kill()
+
+
+class TypeChecker:
+    """
+    A long-running `tsc --watch` for one project. tsc keeps the program in memory and
+    only re-checks what changed, so a check after an edit costs milliseconds instead of
+    a full re-parse.
+    """
+
+    def __init__(self, project: str):
+        self.project = project
+        self._cond = Condition()
+        self._proc: subprocess.Popen | None = None
+        self._cycles = 0
+        self._compiling = False
+        self._cycle_started = 0.0
+        self._last_write = 0.0
+        self._lines: list[str] = []
+        self._diagnostics: list[str] = []
+        self._error_count = 0
+
+    def start(self) -> None:
+        logging.info(f"Starting type checker for {self.project}")
+        self._proc = subprocess.Popen(
+            "npx tsc --noEmit --incremental --watch --preserveWatchOutput --pretty false",
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            cwd=self.project,
+            shell=True,
+            start_new_session=platform.system() != "Windows",
+        )
+        Thread(target=self._read_output, daemon=True).start()
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def _read_output(self) -> None:
+        for line in self._proc.stdout:
+            line = line.rstrip("\n")
+            with self._cond:
+                if CYCLE_START_RE.search(line):
+                    self._compiling = True
+                    self._cycle_started = time.monotonic()
+                    self._lines = []
+                elif match := CYCLE_END_RE.search(line):
+                    self._error_count = int(match.group(1))
+                    self._diagnostics = self._lines
+                    self._lines = []
+                    self._compiling = False
+                    self._cycles += 1
+                    self._cond.notify_all()
+                elif line.strip():
+                    self._lines.append(line)
+        with self._cond:
+            self._compiling = False
+            self._cond.notify_all()
+
+    def notify_write(self, rel_path: str) -> None:
+        if rel_path.endswith(TS_EXTENSIONS):
+            with self._cond:
+                self._last_write = time.monotonic()
+
+    def check(self, timeout: float = 120.0) -> tuple[int, list[str]]:
+        """
+        Waits for a compile that covers every write so far and returns (error count, diagnostic lines).
+        Raises RuntimeError if tsc exits or never finishes its first compile.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if not self.alive:
+                    raise RuntimeError(
+                        "tsc exited: " + "\n".join(self._lines[-20:] or ["no output"])
+                    )
+                now = time.monotonic()
+                up_to_date = (
+                    self._cycles > 0
+                    and not self._compiling
+                    and (
+                        self._cycle_started >= self._last_write
+                        or now - self._last_write > RECOMPILE_GRACE
+                    )
+                )
+                if up_to_date:
+                    return self._error_count, list(self._diagnostics)
+                if now >= deadline:
+                    if self._cycles == 0:
+                        raise RuntimeError(
+                            "tsc did not finish its first compile in time"
+                        )
+                    return self._error_count, list(self._diagnostics)
+                self._cond.wait(min(deadline - now, 0.1))
+
+    def stop(self) -> None:
+        if self._proc is not None:
+            logging.info(f"Stopping type checker for {self.project}")
+            kill_process_group(self._proc)
+
+
+class LintWorker:
+    """
+    A resident ESLint process for one project (see eslint_worker.mjs). Config and plugins
+    are loaded once, and each request lints only the paths it is given.
+    """
+
+    def __init__(self, project: str):
+        self.project = project
+        self._lock = Lock()
+        self._proc: subprocess.Popen | None = None
+        self._stderr: deque[str] = deque(maxlen=50)
+        self._next_id = 0
+
+    def start(self) -> None:
+        logging.info(f"Starting lint worker for {self.project}")
+        self._proc = subprocess.Popen(
+            ["node", ESLINT_WORKER],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            cwd=self.project,
+            start_new_session=platform.system() != "Windows",
+        )
+        Thread(target=self._drain_stderr, daemon=True).start()
+        ready = self._proc.stdout.readline()
+        if not ready:
+            raise RuntimeError(
+                "ESLint worker failed to start: " + "".join(self._stderr)
+            )
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def _drain_stderr(self) -> None:
+        for line in self._proc.stderr:
+            self._stderr.append(line)
+
+    def lint(self, files: list[str]) -> dict:
+        """Lints the given project-relative paths (all of the project if empty) and returns the worker's result."""
+        with self._lock:
+            self._next_id += 1
+            request = {"id": self._next_id, "files": files}
+            try:
+                self._proc.stdin.write(json.dumps(request) + "\n")
+                self._proc.stdin.flush()
+                response = self._proc.stdout.readline()
+            except (BrokenPipeError, OSError):
+                response = ""
+        if not response:
+            raise RuntimeError("ESLint worker exited: " + "".join(self._stderr))
+        result = json.loads(response)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        return result
+
+    def stop(self) -> None:
+        if self._proc is not None:
+            logging.info(f"Stopping lint worker for {self.project}")
+            kill_process_group(self._proc)
+
+
+def format_lint(result: dict) -> str:
+    lines = []
+    for file_result in result.get("results", []):
+        for message in file_result["messages"]:
+            lines.append(
+                f"{file_result['file']}:{message['line']}:{message['column']}  "
+                f"{message['severity']}  {message['message']}  {message['rule']}".rstrip()
+            )
+    lines.append(
+        f"{result.get('errorCount', 0)} errors, {result.get('warningCount', 0)} warnings"
+    )
+    return "\n".join(lines)
+
+
+_type_checkers: dict[str, TypeChecker] = {}
+_lint_workers: dict[str, LintWorker] = {}
+_changed_since_lint: dict[str, set[str]] = {}
+_changed_since_green: dict[str, set[str]] = {}
+_registry_lock = Lock()
+
+
+def get_type_checker(project: str) -> TypeChecker:
+    with _registry_lock:
+        checker = _type_checkers.get(project)
+        if checker is None or not checker.alive:
+            checker = TypeChecker(project)
+            checker.start()
+            _type_checkers[project] = checker
+        return checker
+
+
+def get_lint_worker(project: str) -> LintWorker:
+    with _registry_lock:
+        worker = _lint_workers.get(project)
+        if worker is None or not worker.alive:
+            worker = LintWorker(project)
+            worker.start()
+            _lint_workers[project] = worker
+        return worker
+
+
+def notify_write(project: str, rel_path: str) -> None:
+    """Tells the project's resident checkers that a file was written."""
+    rel_path = rel_path.lstrip("/")
+    journal = current_journal()
+    with _registry_lock:
+        checker = _type_checkers.get(project)
+        if rel_path.endswith(LINT_EXTENSIONS):
+            # concurrent tasks each lint their own writes; untracked writes share one set
+            if journal is not None:
+                journal.unlinted.add(rel_path)
+            else:
+                _changed_since_lint.setdefault(project, set()).add(rel_path)
+            _changed_since_green.setdefault(project, set()).add(rel_path)
+    if checker is not None:
+        checker.notify_write(rel_path)
+
+
+def take_changed_for_lint(project: str) -> list[str]:
+    """
+    Returns and forgets the lintable files the current task wrote since its last call,
+    or outside a task the files written by no task.
+    """
+    journal = current_journal()
+    with _registry_lock:
+        if journal is not None:
+            changed, journal.unlinted = journal.unlinted, set()
+        else:
+            changed = _changed_since_lint.pop(project, set())
+    return sorted(
+        path for path in changed if os.path.exists(os.path.join(project, path))
+    )
+
+
+def changed_since_green(project: str) -> list[str]:
+    """Lintable files written since the project last passed verification."""
+    with _registry_lock:
+        changed = set(_changed_since_green.get(project, set()))
+    return sorted(
+        path for path in changed if os.path.exists(os.path.join(project, path))
+    )
+
+
+def mark_green(project: str) -> None:
+    with _registry_lock:
+        _changed_since_green.pop(project, None)
+
+
+def shutdown_checkers(project: str) -> None:
+    with _registry_lock:
+        checker = _type_checkers.pop(project, None)
+        worker = _lint_workers.pop(project, None)
+        _changed_since_lint.pop(project, None)
+        _changed_since_green.pop(project, None)
+    if checker is not None:
+        checker.stop()
+    if worker is not None:
+        worker.stop()
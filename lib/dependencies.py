@@ -0,0 +1,209 @@
+import json
+import logging
+import os
+import subprocess
+from threading import Lock
+from lib.store import link_project_packages
+from lib.ledger import STATE_DIR, project_ledger
+
+# npm cannot run two installs against the same node_modules at once
+_npm_locks: dict[str, Lock] = {}
+_queues: dict[str, "DependencyQueue"] = {}
+_registry_lock = Lock()
+
+
+def npm_lock(project: str) -> Lock:
+    with _registry_lock:
+        return _npm_locks.setdefault(project, Lock())
+
+
+def split_spec(package: str) -> tuple[str, str]:
+    """Splits an npm package spec such as @scope/pkg@^2 into (name, version range)."""
+    at = package.rfind("@")
+    if at > 0:
+        return package[:at], package[at + 1 :]
+    return package, ""
+
+
+def _npm_error(output: str) -> str:
+    """The first npm error line of output, to explain a failed install in one line."""
+    lines = [line.strip() for line in output.splitlines() if line.strip()]
+    errors = [line for line in lines if line.startswith(("npm ERR!", "npm error"))]
+    return (errors or lines or ["npm install failed"])[0][:200]
+
+
+class DependencyQueue:
+    """
+    Collects install and remove requests for one project during a plan phase and applies
+    them as a single npm transaction when the phase ends. A later request for a package
+    replaces an earlier one, so install-then-remove costs nothing.
+    Queued changes are also written to .unlovable/dependencies.json so a resumed run
+    still applies changes queued by tasks that finished before it stopped.
+    """
+
+    def __init__(self, project: str):
+        self.project = project
+        self.path = os.path.join(project, STATE_DIR, "dependencies.json")
+        self._lock = Lock()
+        # name -> (action, dev, version range)
+        self._ops: dict[str, tuple[str, bool, str]] = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as file:
+                    self._ops = {
+                        name: tuple(op) for name, op in json.load(file).items()
+                    }
+            except (OSError, ValueError) as e:
+                logging.error(f"Ignoring unreadable dependency queue {self.path}: {e}")
+
+    def queue(self, action: str, packages: list[str], dev: bool) -> str:
+        with self._lock:
+            for package in packages:
+                name, spec = split_spec(package.strip())
+                if name:
+                    self._ops[name] = (action, dev, spec)
+            self._save()
+        kind = "dev packages" if dev else "packages"
+        verb = "install" if action == "install" else "removal"
+        return (
+            f"Queued {verb} of {kind}: {', '.join(packages)}. "
+            "All queued dependency changes are applied together in one npm install at the end of the current phase; "
+            "until then type errors for these imports are expected. The resolved versions are recorded in the change ledger."
+        )
+
+    @property
+    def pending(self) -> bool:
+        with self._lock:
+            return bool(self._ops)
+
+    def flush(self) -> str:
+        """Applies every queued change with one npm install and returns a resolution report."""
+        with self._lock:
+            ops, self._ops = self._ops, {}
+        if not ops:
+            return ""
+
+        with npm_lock(self.project):
+            report = self._apply(ops)
+        with self._lock:
+            self._save()
+        return report
+
+    def _save(self) -> None:
+        if not self._ops:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._write_json(self.path, self._ops)
+
+    def _apply(self, ops: dict[str, tuple[str, bool, str]]) -> str:
+        package_json_path = os.path.join(self.project, "package.json")
+        lock_path = os.path.join(self.project, "package-lock.json")
+        with open(package_json_path, "r", encoding="utf-8") as file:
+            original_package_json = file.read()
+        original_lock = None
+        if os.path.exists(lock_path):
+            with open(lock_path, "r", encoding="utf-8") as file:
+                original_lock = file.read()
+
+        package_json = json.loads(original_package_json)
+        deps = package_json.setdefault("dependencies", {})
+        dev_deps = package_json.setdefault("devDependencies", {})
+        installed, removed, unpinned = [], [], []
+        for name, (action, dev, spec) in ops.items():
+            if action == "remove":
+                in_deps = deps.pop(name, None) is not None
+                in_dev_deps = dev_deps.pop(name, None) is not None
+                if in_deps or in_dev_deps:
+                    removed.append(name)
+                continue
+            (deps if dev else dev_deps).pop(name, None)
+            (dev_deps if dev else deps)[name] = spec or "latest"
+            installed.append(name)
+            if not spec:
+                unpinned.append((name, dev))
+
+        if not installed and not removed:
+            return "Dependency changes cancelled each other out, nothing to install"
+
+        self._write_json(package_json_path, package_json)
+        try:
+            npm_out = subprocess.run(
+                "npm install --prefer-offline",
+                capture_output=True,
+                text=True,
+                cwd=self.project,
+                check=True,
+                shell=True,
+            )
+        except subprocess.CalledProcessError as e:
+            error_msg = e.stderr or e.stdout or "Unknown error"
+            logging.error(f"Coalesced npm install failed: {error_msg}")
+            with open(package_json_path, "w", encoding="utf-8") as file:
+                file.write(original_package_json)
+            if original_lock is not None:
+                with open(lock_path, "w", encoding="utf-8") as file:
+                    file.write(original_lock)
+            # later tasks and the healer learn from the ledger why these imports fail
+            project_ledger(self.project).record_failed_dependencies(
+                installed, _npm_error(error_msg)
+            )
+            return (
+                f"Dependency installation failed, package.json was restored. "
+                f"Requested installs: {', '.join(installed) or 'none'}; "
+                f"removals: {', '.join(removed) or 'none'}\nError: {error_msg}"
+            )
+
+        # record the resolved version the same way `npm i <name>` would (^x.y.z)
+        lock = None
+        if os.path.exists(lock_path):
+            with open(lock_path, "r", encoding="utf-8") as file:
+                lock = json.load(file)
+        root = lock.get("packages", {}).get("", {}) if lock else {}
+        for name, dev in unpinned:
+            version = self._installed_version(name)
+            if not version:
+                continue
+            section = "devDependencies" if dev else "dependencies"
+            package_json[section][name] = f"^{version}"
+            if name in root.get(section, {}):
+                root[section][name] = f"^{version}"
+        self._write_json(package_json_path, package_json)
+        if lock:
+            self._write_json(lock_path, lock)
+
+        link_project_packages(self.project)
+
+        resolved = {}
+        for name in installed:
+            section = "devDependencies" if ops[name][1] else "dependencies"
+            resolved[name] = package_json[section][name]
+        project_ledger(self.project).record_dependencies(resolved, removed)
+        report = [f"{name}@{spec}" for name, spec in resolved.items()]
+        logging.info(f"Coalesced npm install finished: {npm_out.stdout}")
+        return (
+            f"Installed: {', '.join(report) or 'none'}\n"
+            f"Removed: {', '.join(removed) or 'none'}"
+        )
+
+    def _installed_version(self, name: str) -> str | None:
+        try:
+            path = os.path.join(self.project, "node_modules", name, "package.json")
+            with open(path, "r", encoding="utf-8") as file:
+                return json.load(file).get("version")
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_json(path: str, data: dict) -> None:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=2)
+            file.write("\n")
+
+
+def dependency_queue(project: str) -> DependencyQueue:
+    with _registry_lock:
+        if project not in _queues:
+            _queues[project] = DependencyQueue(project)
+        return _queues[project]
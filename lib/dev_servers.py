@@ -0,0 +1,209 @@
+import logging
+import os
+import platform
+import socket
+import subprocess
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from threading import Condition, Lock, Thread
+from lib.checkers import kill_process_group
+
+# ports are handed out from here upwards, skipping ones in use
+BASE_PORT = int(os.getenv("UNLOVABLE_DEV_SERVER_PORT", "3000"))
+MAX_PORT = BASE_PORT + 1000
+# servers with no output and no API use for this long (seconds) are stopped
+IDLE_TIMEOUT = float(os.getenv("UNLOVABLE_DEV_SERVER_IDLE", "1800"))
+READY_TIMEOUT = 120.0
+PROBE_INTERVAL = 0.5
+REAP_INTERVAL = 60.0
+
+
+def _port_free(port: int) -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.bind(("127.0.0.1", port))
+        except OSError:
+            return False
+    return True
+
+
+class DevServer:
+    """
+    One project's `next dev`, run in its own process group on its own port. Its state
+    goes from starting to ready once an HTTP request gets any response, or to failed
+    when the process exits or does not answer within READY_TIMEOUT.
+    """
+
+    def __init__(self, project: str, port: int):
+        self.project = project
+        self.port = port
+        self.state = "starting"
+        self.started = time.time()
+        self.last_active = time.monotonic()
+        self._proc: subprocess.Popen | None = None
+        self._cond = Condition()
+        self._lines: deque[str] = deque(maxlen=50)
+
+    @property
+    def url(self) -> str:
+        return f"http://localhost:{self.port}"
+
+    def start(self) -> None:
+        logging.info(f"Starting dev server for {self.project} on port {self.port}")
+        self._proc = subprocess.Popen(
+            f"npm run dev -- --port {self.port}",
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            cwd=self.project,
+            shell=True,
+            start_new_session=platform.system() != "Windows",
+        )
+        Thread(target=self._read_output, daemon=True).start()
+        Thread(target=self._probe, daemon=True).start()
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def _set_state(self, state: str) -> None:
+        with self._cond:
+            if self.state in ("starting", "ready"):
+                self.state = state
+            self._cond.notify_all()
+
+    def _read_output(self) -> None:
+        # next dev logs compiles and requests, which is how activity is noticed
+        for line in self._proc.stdout:
+            self._lines.append(line.rstrip("\n"))
+            self.touch()
+        self._set_state("failed")
+
+    def _probe(self) -> None:
+        deadline = time.monotonic() + READY_TIMEOUT
+        while self.alive and time.monotonic() < deadline:
+            try:
+                urllib.request.urlopen(self.url, timeout=PROBE_INTERVAL * 4).close()
+                self._set_state("ready")
+                return
+            except urllib.error.HTTPError:
+                # any HTTP answer, even an error page, means the server is up
+                self._set_state("ready")
+                return
+            except (urllib.error.URLError, OSError):
+                time.sleep(PROBE_INTERVAL)
+        if self.state == "starting":
+            logging.error(
+                f"Dev server for {self.project} did not become ready:\n"
+                + "\n".join(list(self._lines)[-20:])
+            )
+            self._set_state("failed")
+
+    def wait_ready(self, timeout: float = READY_TIMEOUT) -> bool:
+        with self._cond:
+            self._cond.wait_for(lambda: self.state != "starting", timeout)
+            return self.state == "ready"
+
+    def touch(self) -> None:
+        self.last_active = time.monotonic()
+
+    @property
+    def idle(self) -> float:
+        return time.monotonic() - self.last_active
+
+    def stop(self) -> None:
+        with self._cond:
+            self.state = "stopped"
+            self._cond.notify_all()
+        if self._proc is not None:
+            logging.info(f"Stopping dev server for {self.project}")
+            kill_process_group(self._proc)
+
+    def info(self) -> dict:
+        return {
+            "path": self.project,
+            "port": self.port,
+            "url": self.url,
+            "state": self.state,
+            "started": self.started,
+            "idle": round(self.idle),
+            "output": list(self._lines)[-10:],
+        }
+
+
+class DevServerSupervisor:
+    """
+    Runs at most one dev server per project, each on a free port, and stops servers that
+    sit idle for IDLE_TIMEOUT. Nothing blocks a worker thread while a server runs.
+    """
+
+    def __init__(self, idle_timeout: float = IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._lock = Lock()
+        self._servers: dict[str, DevServer] = {}
+        self._reaper: Thread | None = None
+
+    def _free_port(self) -> int:
+        taken = {server.port for server in self._servers.values()}
+        for port in range(BASE_PORT, MAX_PORT):
+            if port not in taken and _port_free(port):
+                return port
+        raise RuntimeError(f"No free port between {BASE_PORT} and {MAX_PORT}")
+
+    def ensure(self, project: str) -> DevServer:
+        """The project's running dev server, started on a free port if there is none."""
+        with self._lock:
+            server = self._servers.get(project)
+            if server is not None and server.alive and server.state != "failed":
+                server.touch()
+                return server
+            if server is not None:
+                server.stop()
+            server = DevServer(project, self._free_port())
+            server.start()
+            self._servers[project] = server
+            if self._reaper is None:
+                self._reaper = Thread(target=self._reap, daemon=True)
+                self._reaper.start()
+            return server
+
+    def restart(self, project: str) -> DevServer:
+        self.stop(project)
+        return self.ensure(project)
+
+    def stop(self, project: str) -> bool:
+        with self._lock:
+            server = self._servers.pop(project, None)
+        if server is None:
+            return False
+        server.stop()
+        return True
+
+    def stop_all(self) -> None:
+        with self._lock:
+            servers = list(self._servers.values())
+            self._servers.clear()
+        for server in servers:
+            server.stop()
+
+    def list(self) -> list[dict]:
+        with self._lock:
+            return [server.info() for server in self._servers.values()]
+
+    def _reap(self) -> None:
+        while True:
+            time.sleep(REAP_INTERVAL)
+            with self._lock:
+                idle = [
+                    project
+                    for project, server in self._servers.items()
+                    if server.idle > self.idle_timeout
+                ]
+            for project in idle:
+                logging.info(f"Stopping idle dev server for {project}")
+                self.stop(project)
+
+
+dev_servers = DevServerSupervisor()
@@ -0,0 +1,129 @@
+import os
+import re
+from typing import TypedDict
+
+# tsc --pretty false: src/app/page.tsx(12,5): error TS2304: Cannot find name 'x'.
+TSC_RE = re.compile(
+    r"^(?P<file>[^\s(][^(]*)\((?P<line>\d+),(?P<column>\d+)\):\s+(?P<severity>error|warning)\s+(?P<code>TS\d+):\s*(?P<message>.*)$"
+)
+# format_lint: src/app/page.tsx:12:7  error  'x' is assigned a value but never used.  no-unused-vars
+LINT_RE = re.compile(
+    r"^(?P<file>\S[^:]*):(?P<line>\d+):(?P<column>\d+)\s{2}(?P<severity>error|warning)\s{2}(?P<message>.*?)(?:\s{2}(?P<code>[\w@/-]+))?$"
+)
+# next build names the file on its own line, optionally with a position...
+BUILD_LOCATION_RE = re.compile(
+    r"^\.?/?(?P<file>(?:src|app|pages|public)/[^\s:]+?)(?::(?P<line>\d+):(?P<column>\d+))?$"
+)
+# ...followed by ESLint findings for that file...
+BUILD_LINT_RE = re.compile(
+    r"^(?P<line>\d+):(?P<column>\d+)\s+(?P<severity>Error|Warning):\s+(?P<message>.*?)(?:\s{2,}(?P<code>[\w@/-]+))?$"
+)
+# ...or a compiler error for the position above
+BUILD_ERROR_RE = re.compile(
+    r"^(?P<code>Type error|Module not found|Error|SyntaxError|ReferenceError|TypeError):\s*(?P<message>.*)$"
+)
+SWC_ERROR_RE = re.compile(r"^[x×]\s+(?P<message>.+)$")
+SEVERITIES = {"Warning": "warning", "Error": "error"}
+
+
+class Diagnostic(TypedDict):
+    file: str
+    line: int
+    column: int
+    code: str
+    severity: str
+    message: str
+
+
+def _relative(project: str, path: str) -> str:
+    path = path.strip()
+    if os.path.isabs(path):
+        path = os.path.relpath(path, project)
+    path = path.replace(os.sep, "/")
+    return path[2:] if path.startswith("./") else path
+
+
+def parse_diagnostics(output: str, project: str) -> list[Diagnostic]:
+    """
+    Turns tsc, ESLint (format_lint) and next build output into diagnostics with the file
+    relative to the project, deduplicated on (file, line, code, message) in output order.
+    Lines that are none of these, like stack traces and progress output, are dropped.
+
+    >>> from lib.checkers import format_lint
+    >>> lint = {"errorCount": 1, "warningCount": 0, "results": [{"file": "src/app/page.tsx",
+    ...     "messages": [{"line": 3, "column": 7, "severity": "error", "rule": "no-undef",
+    ...     "message": "'x' is not defined."}]}]}
+    >>> parse_diagnostics(format_lint(lint), "/project")  # doctest: +NORMALIZE_WHITESPACE
+    [{'file': 'src/app/page.tsx', 'line': 3, 'column': 7, 'code': 'no-undef',
+      'severity': 'error', 'message': "'x' is not defined."}]
+    """
+    diagnostics: dict[tuple, Diagnostic] = {}
+    # file and position of the last build location line, for the lines that follow it
+    location: tuple[str, str | None, str | None] | None = None
+    # SWC puts the message of a bare "Error:" on the next "x ..." line
+    pending_code: str | None = None
+
+    def add(file: str, line, column, code, severity, message: str) -> None:
+        diagnostic = Diagnostic(
+            file=_relative(project, file),
+            line=int(line or 0),
+            column=int(column or 0),
+            code=code or "",
+            severity=SEVERITIES.get(severity, severity or "error"),
+            message=message.strip(),
+        )
+        key = (
+            diagnostic["file"],
+            diagnostic["line"],
+            diagnostic["code"],
+            diagnostic["message"],
+        )
+        diagnostics.setdefault(key, diagnostic)
+
+    for raw in output.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        if match := TSC_RE.match(line):
+            add(**match.groupdict())
+            location = None
+        elif match := LINT_RE.match(line):
+            add(**match.groupdict())
+            location = None
+        elif match := BUILD_LOCATION_RE.match(line):
+            location = (match["file"], match["line"], match["column"])
+            pending_code = None
+        elif location is None:
+            continue
+        elif match := BUILD_LINT_RE.match(line):
+            add(location[0], **match.groupdict())
+        elif match := BUILD_ERROR_RE.match(line):
+            if match["message"]:
+                add(*location, match["code"], "error", match["message"])
+            else:
+                pending_code = match["code"]
+        elif pending_code and (match := SWC_ERROR_RE.match(line)):
+            add(*location, pending_code, "error", match["message"])
+            pending_code = None
+    return list(diagnostics.values())
+
+
+def group_by_file(diagnostics: list[Diagnostic]) -> dict[str, list[Diagnostic]]:
+    """Diagnostics per file, files with errors first, in the order they were reported."""
+    groups: dict[str, list[Diagnostic]] = {}
+    for diagnostic in diagnostics:
+        groups.setdefault(diagnostic["file"], []).append(diagnostic)
+    return dict(
+        sorted(
+            groups.items(),
+            key=lambda item: all(d["severity"] != "error" for d in item[1]),
+        )
+    )
+
+
+def format_diagnostics(diagnostics: list[Diagnostic]) -> str:
+    return "\n".join(
+        f"{d['file']}:{d['line']}:{d['column']}  {d['severity']}  "
+        f"{d['message']}  {d['code']}".rstrip()
+        for d in diagnostics
+    )
@@ -0,0 +1,55 @@
+// Resident ESLint worker for one project (run with the project as cwd).
+// Loads the project's ESLint and config once, then answers one JSON request per stdin line:
+//   {"id": 1, "files": ["src/app/page.tsx"]}  (an empty list lints the whole project)
+// with one JSON response per stdout line.
+import { createRequire } from "node:module";
+import path from "node:path";
+import readline from "node:readline";
+
+const cwd = process.cwd();
+const require = createRequire(path.join(cwd, "package.json"));
+const eslintModule = require("eslint");
+const ESLintClass = eslintModule.loadESLint
+  ? await eslintModule.loadESLint({ cwd })
+  : eslintModule.ESLint;
+const eslint = new ESLintClass({ cwd, errorOnUnmatchedPattern: false });
+
+function send(message) {
+  process.stdout.write(JSON.stringify(message) + "\n");
+}
+
+send({ ready: true });
+
+const lines = readline.createInterface({ input: process.stdin });
+for await (const line of lines) {
+  let request;
+  try {
+    request = JSON.parse(line);
+  } catch {
+    continue;
+  }
+
+  try {
+    const files = request.files && request.files.length ? request.files : ["."];
+    const results = await eslint.lintFiles(files);
+    send({
+      id: request.id,
+      errorCount: results.reduce((sum, r) => sum + r.errorCount, 0),
+      warningCount: results.reduce((sum, r) => sum + r.warningCount, 0),
+      results: results
+        .filter((r) => r.messages.length)
+        .map((r) => ({
+          file: path.relative(cwd, r.filePath).split(path.sep).join("/"),
+          messages: r.messages.map((m) => ({
+            line: m.line ?? 0,
+            column: m.column ?? 0,
+            severity: m.severity === 2 ? "error" : "warning",
+            rule: m.ruleId ?? "",
+            message: m.message,
+          })),
+        })),
+    });
+  } catch (error) {
+    send({ id: request.id, error: String(error?.stack ?? error) });
+  }
+}
@@ -0,0 +1,253 @@
+import difflib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from hashlib import sha256
+from threading import Lock
+from lib.diagnostics import Diagnostic
+
+# neighbouring lines recorded around each change; a replay only uses as many of them as
+# it takes to make the change unique in the target file
+MAX_CONTEXT = 3
+# heals that rewrote more than this many lines are too project-specific to replay
+MAX_PATCH_LINES = 40
+# patches whose smoothed success rate falls below this are no longer offered
+MIN_SCORE = 0.25
+
+PATH_RE = re.compile(r"(?:[\w@.()\[\]-]*/)+[\w@.()\[\]-]+")
+NUMBER_RE = re.compile(r"\d+")
+
+
+def fingerprint(diagnostics: list[Diagnostic]) -> str:
+    """
+    Identifies the errors of one file independently of the project: file paths, line
+    numbers and other numbers are blanked out of each message, and the order of the
+    errors does not matter.
+    """
+    parts = set()
+    for diagnostic in diagnostics:
+        message = PATH_RE.sub("<path>", diagnostic["message"].casefold())
+        message = NUMBER_RE.sub("<n>", message)
+        parts.add(f"{diagnostic['code']} {' '.join(message.split())}")
+    return sha256("\n".join(sorted(parts)).encode()).hexdigest()
+
+
+def _hunks(before: str, after: str) -> list[dict] | None:
+    """Line replacements turning before into after, None if too large."""
+    a = before.splitlines(keepends=True)
+    b = after.splitlines(keepends=True)
+    hunks, changed = [], 0
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(
+        None, a, b, autojunk=False
+    ).get_opcodes():
+        if tag == "equal":
+            continue
+        changed += max(i2 - i1, j2 - j1)
+        if changed > MAX_PATCH_LINES:
+            return None
+        if i1 == 0:
+            # changes at the top of a file (e.g. adding "use client") need no anchor
+            hunks.append(
+                {"start": True, "old": "".join(a[:i2]), "new": "".join(b[:j2])}
+            )
+            continue
+        # the changed lines are the anchor; the neighbours are only kept to tell apart
+        # several places in a target file that hold the same lines
+        hunks.append(
+            {
+                "start": False,
+                "head": "".join(a[max(0, i1 - MAX_CONTEXT) : i1]),
+                "old": "".join(a[i1:i2]),
+                "new": "".join(b[j1:j2]),
+                "tail": "".join(a[i2 : i2 + MAX_CONTEXT]),
+            }
+        )
+    return hunks
+
+
+def _line_starts(content: str, text: str) -> list[int]:
+    """Offsets in content where text occurs as whole lines."""
+    found, position = [], content.find(text)
+    while position != -1:
+        end = position + len(text)
+        if (position == 0 or content[position - 1] == "\n") and (
+            text.endswith("\n") or end == len(content) or content[end] == "\n"
+        ):
+            found.append(position)
+        position = content.find(text, position + 1)
+    return found
+
+
+def _apply_hunk(content: str, hunk: dict) -> str | None:
+    """
+    Replaces hunk["old"] where it occurs once in content. The recorded neighbouring lines
+    are added one at a time, nearest first, only while the change is ambiguous.
+    """
+    head = hunk.get("head", "").splitlines(keepends=True)
+    tail = hunk.get("tail", "").splitlines(keepends=True)
+    for context in range(MAX_CONTEXT + 1):
+        prefix = "".join(head[len(head) - min(context, len(head)) :])
+        suffix = "".join(tail[:context])
+        for before, after in dict.fromkeys(
+            [("", suffix), (prefix, ""), (prefix, suffix)] if context else [("", "")]
+        ):
+            text = before + hunk["old"] + after
+            if not text:
+                continue
+            matches = _line_starts(content, text)
+            if len(matches) == 1:
+                at = matches[0] + len(before)
+                return content[:at] + hunk["new"] + content[at + len(hunk["old"]) :]
+    return None
+
+
+def make_patch(
+    project: str, file: str, originals: dict[str, bytes | None]
+) -> dict[str, list[dict]] | None:
+    """
+    The changes a heal made, from the journal's originals and the files now on disk.
+    The healed file is stored under "" so the patch applies to whichever file shows the
+    same errors; other files (configs, shared components) keep their path. Returns None
+    for heals that created or deleted files or changed too much to replay.
+    """
+    patch = {}
+    for rel_path, before in originals.items():
+        path = os.path.join(project, rel_path)
+        if before is None or not os.path.isfile(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                after_text = f.read().decode("utf-8")
+            before_text = before.decode("utf-8")
+        except (OSError, UnicodeDecodeError):
+            return None
+        if before_text == after_text:
+            continue
+        hunks = _hunks(before_text, after_text)
+        if hunks is None:
+            return None
+        patch["" if rel_path == file else rel_path] = hunks
+    return patch or None
+
+
+def apply_patch(project: str, file: str, patch: dict) -> dict[str, str] | None:
+    """
+    New contents of every file a patch changes, or None if any hunk does not match
+    exactly once, even with its recorded neighbouring lines. Nothing is written here.
+    """
+    contents = {}
+    for key, hunks in patch.items():
+        rel_path = key or file
+        try:
+            with open(os.path.join(project, rel_path), "r", encoding="utf-8") as f:
+                content = f.read()
+        except (OSError, UnicodeDecodeError):
+            return None
+        for hunk in hunks:
+            if hunk["start"]:
+                if not content.startswith(hunk["old"]):
+                    return None
+                content = hunk["new"] + content[len(hunk["old"]) :]
+            else:
+                content = _apply_hunk(content, hunk)
+                if content is None:
+                    return None
+        contents[rel_path] = content
+    return contents
+
+
+class FixMemory:
+    """
+    Disk-backed store shared by all projects that maps error fingerprints to patches that
+    fixed them, with how often each patch worked. The heal loop replays the best-ranked
+    patch that applies before asking the healer, so recurring failures (a missing
+    "use client", a next/router import) are fixed without a model call.
+    """
+
+    def __init__(self, path: str, max_entries: int = 2000):
+        self.max_entries = max_entries
+        self._lock = Lock()
+        self._counters = {"offered": 0, "successes": 0, "failures": 0, "learned": 0}
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS fixes ("
+            "fingerprint TEXT NOT NULL, patch_key TEXT NOT NULL, patch TEXT NOT NULL, "
+            "successes INTEGER NOT NULL, failures INTEGER NOT NULL, used REAL NOT NULL, "
+            "PRIMARY KEY (fingerprint, patch_key))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS fixes_used ON fixes (used)")
+        self._db.commit()
+
+    @staticmethod
+    def patch_key(patch: dict) -> str:
+        # the same fix recorded in different files differs only in its neighbouring lines
+        changes = {
+            key: [[hunk["start"], hunk["old"], hunk["new"]] for hunk in hunks]
+            for key, hunks in patch.items()
+        }
+        return sha256(json.dumps(changes, sort_keys=True).encode()).hexdigest()
+
+    def candidates(self, fingerprint: str) -> list[dict]:
+        """Known patches for a fingerprint, best first by smoothed success rate."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT patch, successes, failures FROM fixes WHERE fingerprint = ? "
+                "ORDER BY (successes + 1.0) / (successes + failures + 2.0) DESC, used DESC",
+                (fingerprint,),
+            ).fetchall()
+        return [
+            json.loads(patch)
+            for patch, successes, failures in rows
+            if (successes + 1.0) / (successes + failures + 2.0) >= MIN_SCORE
+        ]
+
+    def offered(self) -> None:
+        with self._lock:
+            self._counters["offered"] += 1
+
+    def record(self, fingerprint: str, patch: dict, success: bool) -> None:
+        """
+        Counts the outcome of a patch. A patch not in the store yet is only added when it
+        worked, so one-off heals that failed leave nothing behind.
+        """
+        key = self.patch_key(patch)
+        now = time.time()
+        with self._lock:
+            self._counters["successes" if success else "failures"] += 1
+            column = "successes" if success else "failures"
+            updated = self._db.execute(
+                f"UPDATE fixes SET {column} = {column} + 1, used = ? "
+                "WHERE fingerprint = ? AND patch_key = ?",
+                (now, fingerprint, key),
+            ).rowcount
+            if not updated and success:
+                self._db.execute(
+                    "INSERT INTO fixes (fingerprint, patch_key, patch, successes, failures, used) "
+                    "VALUES (?, ?, ?, 1, 0, ?)",
+                    (fingerprint, key, json.dumps(patch), now),
+                )
+                self._counters["learned"] += 1
+                (count,) = self._db.execute("SELECT COUNT(*) FROM fixes").fetchone()
+                if count > self.max_entries:
+                    self._db.execute(
+                        "DELETE FROM fixes WHERE rowid IN (SELECT rowid FROM fixes ORDER BY used LIMIT ?)",
+                        (count - self.max_entries,),
+                    )
+            self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM fixes")
+            self._db.commit()
+        logging.info("Fix memory cleared")
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            (entries,) = self._db.execute("SELECT COUNT(*) FROM fixes").fetchone()
+            return {**self._counters, "entries": entries}
@@ -0,0 +1,183 @@
+import json
+import os
+import time
+from bisect import bisect_left
+import uuid
+from threading import Condition, Event, Lock
+from typing import Any, Iterator
+
+# high-volume live output (model tokens, tool calls) as opposed to progress milestones
+LIVE_STAGES = ("token", "tool_call")
+# live events kept per running job; finished jobs keep only their milestones
+MAX_LIVE_EVENTS = 2000
+# finished jobs are forgotten this many seconds after they end
+JOB_RETENTION = float(os.getenv("UNLOVABLE_JOB_RETENTION", "3600"))
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """
+    A single project generation run. Progress is recorded as a list of numbered events
+    that any number of readers can follow, and cancellation is checked between graph steps.
+    Only the latest MAX_LIVE_EVENTS live events are kept, so event numbers can have gaps.
+    """
+
+    def __init__(self, path: str):
+        self.id = uuid.uuid4().hex
+        self.path = path
+        self.status = "queued"
+        self.error: str | None = None
+        # where the generated site is previewed once the job succeeded
+        self.url: str | None = None
+        self.created = time.time()
+        self.finished: float | None = None
+        self.events: list[dict[str, Any]] = []
+        self._seq = 0
+        self._live = 0
+        self._cond = Condition()
+        self._cancel = Event()
+
+    def emit(self, stage: str, message: str, **data: Any) -> None:
+        with self._cond:
+            event = {
+                "seq": self._seq,
+                "time": time.time(),
+                "stage": stage,
+                "message": message,
+                **data,
+            }
+            self._seq += 1
+            self.events.append(event)
+            if stage in LIVE_STAGES:
+                self._live += 1
+                # trimmed in batches so a long stream does not copy the list per event
+                if self._live > 2 * MAX_LIVE_EVENTS:
+                    self._trim_live(MAX_LIVE_EVENTS)
+            self._cond.notify_all()
+
+    def _trim_live(self, keep: int) -> None:
+        drop = self._live - keep
+        if drop <= 0:
+            return
+        events = []
+        for event in self.events:
+            if drop and event["stage"] in LIVE_STAGES:
+                drop -= 1
+                continue
+            events.append(event)
+        self.events = events
+        self._live = keep
+
+    def set_status(
+        self, status: str, error: str | None = None, url: str | None = None
+    ) -> None:
+        # followers stop once the job is done, so a final status only becomes visible
+        # together with its event
+        with self._cond:
+            self.status = status
+            self.error = error
+            self.url = url
+            self.emit("status", status, status=status, error=error, url=url)
+            if self.done:
+                self.finished = time.time()
+                self._trim_live(0)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed", "cancelled")
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check_cancelled(self) -> None:
+        if self._cancel.is_set():
+            raise JobCancelled(f"Job {self.id} was cancelled")
+
+    def follow(self, start: int = 0, timeout: float = 15.0) -> Iterator[dict | None]:
+        """
+        Yields events numbered start and up until the job is done.
+        Yields None whenever timeout passes without a new event so callers can send keep-alives.
+        """
+        seq = start
+        while True:
+            with self._cond:
+                if seq >= self._seq and not self.done:
+                    self._cond.wait(timeout)
+                position = bisect_left(self.events, seq, key=lambda e: e["seq"])
+                pending = self.events[position:]
+                finished = self.done
+            if not pending:
+                if finished:
+                    return
+                yield None
+            for event in pending:
+                yield event
+            if pending:
+                seq = pending[-1]["seq"] + 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._cond:
+            last_event = next(
+                (e for e in reversed(self.events) if e["stage"] not in LIVE_STAGES),
+                None,
+            )
+        return {
+            "id": self.id,
+            "path": self.path,
+            "status": self.status,
+            "error": self.error,
+            "url": self.url,
+            "created": self.created,
+            "last_event": last_event,
+        }
+
+
+_jobs: dict[str, Job] = {}
+_jobs_lock = Lock()
+
+
+def _evict_finished() -> None:
+    # called with _jobs_lock held; readers already following an evicted job keep it
+    cutoff = time.time() - JOB_RETENTION
+    for job_id in [
+        job_id
+        for job_id, job in _jobs.items()
+        if job.finished is not None and job.finished < cutoff
+    ]:
+        del _jobs[job_id]
+
+
+def create_job_if_idle(path: str) -> Job | None:
+    """Registers a new job for path, or returns None if a job for path is still running."""
+    with _jobs_lock:
+        _evict_finished()
+        if any(job.path == path and not job.done for job in _jobs.values()):
+            return None
+        job = Job(path)
+        _jobs[job.id] = job
+    return job
+
+
+def get_job(job_id: str) -> Job | None:
+    with _jobs_lock:
+        _evict_finished()
+        return _jobs.get(job_id)
+
+
+def list_jobs() -> list[Job]:
+    with _jobs_lock:
+        _evict_finished()
+        return list(_jobs.values())
+
+
+def sse_format(event: dict | None) -> str:
+    if event is None:
+        return ": keep-alive\n\n"
+    return f"id: {event['seq']}\nevent: {event['stage']}\ndata: {json.dumps(event)}\n\n"
@@ -0,0 +1,206 @@
+import logging
+import os
+import shutil
+import stat
+import tempfile
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from lib.read_cache import read_cache
+
+_current_journal: ContextVar["Journal | None"] = ContextVar(
+    "current_journal", default=None
+)
+
+
+def atomic_write(path: str, content: str | bytes, mode: int | None = None) -> None:
+    """Writes a file through a temporary file and a rename, so readers never see half of it."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    if mode is None and os.path.exists(path):
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    fd, tmp = tempfile.mkstemp(prefix=".unlovable-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb" if isinstance(content, bytes) else "w") as file:
+            file.write(content)
+        os.chmod(tmp, mode if mode is not None else 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class Journal:
+    """
+    Records the original content of every project file an agent changes during one task,
+    so the task's changes can be committed or rolled back as a unit.
+    """
+
+    def __init__(self, project: str, label: str):
+        self.project = project
+        self.label = label
+        self._lock = Lock()
+        # rel path -> (original bytes, mode), or None if the file did not exist
+        self._originals: dict[str, tuple[bytes, int] | None] = {}
+        self._created_dirs: list[str] = []
+        # directory trees that only exist because a directory was moved there
+        self._moved_dirs: list[str] = []
+        # lintable files this task wrote that its next lint has not covered yet
+        self.unlinted: set[str] = set()
+        self.closed = False
+
+    def _full_path(self, rel_path: str) -> str:
+        return os.path.join(self.project, rel_path)
+
+    def _remember(self, rel_path: str) -> None:
+        if rel_path in self._originals:
+            return
+        path = self._full_path(rel_path)
+        if os.path.isfile(path):
+            with open(path, "rb") as file:
+                self._originals[rel_path] = (
+                    file.read(),
+                    stat.S_IMODE(os.stat(path).st_mode),
+                )
+        else:
+            self._originals[rel_path] = None
+
+    def _make_dirs(self, directory: str) -> None:
+        missing = []
+        while directory and not os.path.exists(directory):
+            missing.append(directory)
+            directory = os.path.dirname(directory)
+        if missing:
+            os.makedirs(missing[0], exist_ok=True)
+            self._created_dirs.extend(reversed(missing))
+
+    def write(self, rel_path: str, content: str) -> None:
+        rel_path = rel_path.strip().lstrip("/")
+        with self._lock:
+            self._remember(rel_path)
+            path = self._full_path(rel_path)
+            self._make_dirs(os.path.dirname(path))
+            atomic_write(path, content)
+            read_cache.invalidate(path)
+
+    def move(self, rel_path: str, dest_rel_path: str) -> None:
+        src = rel_path.strip().strip("/")
+        dst = dest_rel_path.strip().strip("/")
+        with self._lock:
+            src_path, dst_path = self._full_path(src), self._full_path(dst)
+            if os.path.isdir(dst_path):
+                dst = f"{dst}/{os.path.basename(src)}"
+                dst_path = self._full_path(dst)
+            if os.path.isdir(src_path):
+                if not os.path.exists(dst_path):
+                    self._moved_dirs.append(dst_path)
+                for dirpath, _, filenames in os.walk(src_path):
+                    for name in filenames:
+                        moved = os.path.relpath(
+                            os.path.join(dirpath, name), self.project
+                        ).replace(os.sep, "/")
+                        self._remember(moved)
+                        self._remember(dst + moved[len(src) :])
+            else:
+                self._remember(src)
+                self._remember(dst)
+            self._make_dirs(os.path.dirname(dst_path))
+            shutil.move(src_path, dst_path)
+            read_cache.invalidate(src_path)
+            read_cache.invalidate(dst_path)
+
+    def originals(self) -> dict[str, bytes | None]:
+        """Content each touched file had before, None for files that did not exist."""
+        with self._lock:
+            return {
+                rel_path: original[0] if original else None
+                for rel_path, original in self._originals.items()
+            }
+
+    @property
+    def touched(self) -> list[str]:
+        with self._lock:
+            return sorted(self._originals)
+
+    def commit(self) -> list[str]:
+        """Keeps the changes and returns the paths the task touched."""
+        touched = self.touched
+        with self._lock:
+            self._originals.clear()
+            self._created_dirs.clear()
+            self._moved_dirs.clear()
+            self.closed = True
+        return touched
+
+    def rollback(self) -> list[str]:
+        """Puts every touched file back as it was and returns the touched paths."""
+        touched = self.touched
+        with self._lock:
+            for rel_path, original in self._originals.items():
+                path = self._full_path(rel_path)
+                try:
+                    if original is None:
+                        if os.path.isfile(path):
+                            os.remove(path)
+                    else:
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        atomic_write(path, original[0], original[1])
+                    read_cache.invalidate(path)
+                except OSError as e:
+                    logging.error(f"Rolling back {path} failed with: {e}")
+            # directories the task created are removed again if they ended up empty
+            moved_dirs = [
+                dirpath
+                for root in self._moved_dirs
+                for dirpath, _, _ in os.walk(root, topdown=False)
+            ]
+            for directory in moved_dirs + list(reversed(self._created_dirs)):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    pass
+            self._originals.clear()
+            self._created_dirs.clear()
+            self._moved_dirs.clear()
+            self.closed = True
+        logging.info(f"Rolled back {len(touched)} files written by {self.label}")
+        return touched
+
+
+def current_journal() -> Journal | None:
+    journal = _current_journal.get()
+    return journal if journal is not None and not journal.closed else None
+
+
+def _journal(project: str) -> Journal:
+    # outside a journaled block changes are still atomic, just never rolled back
+    return current_journal() or Journal(project, "untracked")
+
+
+def write_file(project: str, rel_path: str, content: str) -> None:
+    _journal(project).write(rel_path, content)
+
+
+def move_path(project: str, rel_path: str, dest_rel_path: str) -> None:
+    _journal(project).move(rel_path, dest_rel_path)
+
+
+@contextmanager
+def journaled(project: str, label: str):
+    """
+    Routes the file changes agent tools make in this context through a journal.
+    The journal is rolled back if the block raises and committed if the block leaves it open.
+    """
+    journal = Journal(project, label)
+    token = _current_journal.set(journal)
+    try:
+        yield journal
+    except BaseException:
+        if not journal.closed:
+            journal.rollback()
+        raise
+    finally:
+        _current_journal.reset(token)
+    if not journal.closed:
+        journal.commit()
@@ -0,0 +1,233 @@
+import json
+import logging
+import os
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from hashlib import sha256
+from threading import Lock
+from lib.scheduler import paths_overlap
+
+# Per-project state written next to the generated site
+STATE_DIR = ".unlovable"
+
+EXPORT_RE = re.compile(
+    r"export\s+(?:default\s+)?(?:async\s+)?(?:function\*?|const|let|var|class|interface|type|enum)\s+([A-Za-z_$][\w$]*)"
+)
+EXPORT_LIST_RE = re.compile(r"export\s+(?:type\s+)?\{([^}]*)\}")
+ANONYMOUS_DEFAULT_RE = re.compile(
+    r"export\s+default\s+(?!(?:async\s+)?(?:function\*?|class)\s+[A-Za-z_$])"
+)
+# project files named in compiler, linter and build output
+ERROR_PATH_RE = re.compile(r"(?:\./)?((?:src|app|pages|public)/[\w@()\[\].+/-]+\.\w+)")
+
+# the file list a task sees is capped so prompt size stays flat as the plan grows
+MAX_FILES = 30
+MAX_FIXES = 5
+
+_current_actor: ContextVar[str] = ContextVar("ledger_actor", default="")
+
+
+def exported_symbols(source: str) -> list[str]:
+    """Names a TS/JS module exports, found with regexes (no parser needed)."""
+    names = EXPORT_RE.findall(source)
+    for group in EXPORT_LIST_RE.findall(source):
+        for item in group.split(","):
+            item = item.strip()
+            if item:
+                names.append(item.split(" as ")[-1].strip())
+    if ANONYMOUS_DEFAULT_RE.search(source):
+        names.append("default")
+    return list(dict.fromkeys(names))
+
+
+@contextmanager
+def ledger_actor(name: str):
+    """Attributes ledger entries recorded in this context to a task or heal round."""
+    token = _current_actor.set(name)
+    try:
+        yield
+    finally:
+        _current_actor.reset(token)
+
+
+class Ledger:
+    """
+    Structured record of what generation changed in a project: files (with a content hash
+    and exported symbols), dependencies, failed installs, and healer fixes. It lives on disk instead of in
+    the prompt, and each agent is only shown the entries for the paths it works on.
+    """
+
+    def __init__(self, project: str):
+        self.project = project
+        self.path = os.path.join(project, STATE_DIR, "ledger.json")
+        self._lock = Lock()
+        self.files: dict[str, dict] = {}
+        self.dependencies: dict[str, str] = {}
+        # package name -> why its install failed, until a later install of it succeeds
+        self.failed_dependencies: dict[str, str] = {}
+        self.fixes: list[dict] = []
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as file:
+                    data = json.load(file)
+                self.files = data.get("files", {})
+                self.dependencies = data.get("dependencies", {})
+                self.failed_dependencies = data.get("failed_dependencies", {})
+                self.fixes = data.get("fixes", [])
+            except (OSError, ValueError) as e:
+                logging.error(f"Ignoring unreadable ledger {self.path}: {e}")
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "files": self.files,
+                    "dependencies": self.dependencies,
+                    "failed_dependencies": self.failed_dependencies,
+                    "fixes": self.fixes,
+                },
+                file,
+                indent=2,
+            )
+
+    def record_write(self, rel_path: str, content: str, created: bool) -> None:
+        rel_path = rel_path.strip().lstrip("/")
+        with self._lock:
+            previous = self.files.get(rel_path)
+            self.files[rel_path] = {
+                "status": (
+                    "created"
+                    if created or (previous or {}).get("status") == "created"
+                    else "modified"
+                ),
+                "sha": sha256(content.encode()).hexdigest()[:12],
+                "exports": exported_symbols(content),
+                "by": _current_actor.get(),
+            }
+            self._save()
+
+    def record_move(self, rel_path: str, dest_rel_path: str) -> None:
+        src = rel_path.strip().strip("/")
+        dst = dest_rel_path.strip().strip("/")
+        with self._lock:
+            for path in [p for p in self.files if paths_overlap(p, src)]:
+                entry = self.files.pop(path)
+                entry["by"] = _current_actor.get()
+                self.files[dst + path[len(src) :]] = entry
+            self._save()
+
+    def resync(self, rel_paths: list[str]) -> None:
+        """Updates entries for files restored from a snapshot to match what is on disk."""
+        with self._lock:
+            for rel_path in rel_paths:
+                if rel_path not in self.files:
+                    continue
+                try:
+                    with open(
+                        os.path.join(self.project, rel_path), "r", encoding="utf-8"
+                    ) as file:
+                        content = file.read()
+                except FileNotFoundError:
+                    del self.files[rel_path]
+                    continue
+                except (OSError, ValueError):
+                    continue
+                self.files[rel_path]["sha"] = sha256(content.encode()).hexdigest()[:12]
+                self.files[rel_path]["exports"] = exported_symbols(content)
+            self._save()
+
+    def record_dependencies(
+        self, installed: dict[str, str], removed: list[str]
+    ) -> None:
+        with self._lock:
+            self.dependencies.update(installed)
+            for name in list(installed) + removed:
+                self.failed_dependencies.pop(name, None)
+            for name in removed:
+                self.dependencies.pop(name, None)
+            self._save()
+
+    def record_failed_dependencies(self, names: list[str], reason: str) -> None:
+        with self._lock:
+            for name in names:
+                self.failed_dependencies[name] = reason
+            self._save()
+
+    def record_fix(self, trigger: str, paths: list[str]) -> None:
+        with self._lock:
+            self.fixes.append({"trigger": trigger, "paths": paths})
+            self._save()
+
+    def mentioned_paths(self, text: str) -> list[str]:
+        """Project paths named in error output, plus ledger files the output mentions."""
+        paths = ERROR_PATH_RE.findall(text)
+        with self._lock:
+            paths += [path for path in self.files if path in text]
+        return list(dict.fromkeys(paths))
+
+    def files_by(self, actor: str) -> list[str]:
+        with self._lock:
+            return [path for path, entry in self.files.items() if entry["by"] == actor]
+
+    def render(self, paths: list[str]) -> str:
+        """Ledger entries relevant to paths, formatted for an agent prompt."""
+        with self._lock:
+            files = [
+                (path, entry)
+                for path, entry in self.files.items()
+                if any(paths_overlap(path, wanted) for wanted in paths)
+            ][-MAX_FILES:]
+            dependencies = dict(self.dependencies)
+            failed_dependencies = dict(self.failed_dependencies)
+            fixes = [
+                fix
+                for fix in self.fixes
+                if any(
+                    paths_overlap(p, wanted) for p in fix["paths"] for wanted in paths
+                )
+            ][-MAX_FIXES:]
+
+        lines = []
+        if files:
+            lines.append("Files changed earlier in this run:")
+            for path, entry in files:
+                exports = ", ".join(entry["exports"]) or "nothing"
+                by = f' by "{entry["by"]}"' if entry["by"] else ""
+                lines.append(f"- /{path} ({entry['status']}{by}; exports {exports})")
+        if dependencies:
+            lines.append(
+                "Dependencies added: "
+                + ", ".join(f"{name}@{spec}" for name, spec in dependencies.items())
+            )
+        if failed_dependencies:
+            lines.append(
+                "Dependencies that failed to install (imports of them will not resolve): "
+                + ", ".join(
+                    f"{name} ({reason})" for name, reason in failed_dependencies.items()
+                )
+            )
+        if fixes:
+            lines.append("Fixes applied to these files:")
+            for fix in fixes:
+                lines.append(
+                    f"- {', '.join('/' + p for p in fix['paths'])}: {fix['trigger']}"
+                )
+        return "\n".join(lines)
+
+
+_ledgers: dict[str, Ledger] = {}
+_ledgers_lock = Lock()
+
+
+def project_ledger(project: str) -> Ledger:
+    with _ledgers_lock:
+        if project not in _ledgers:
+            _ledgers[project] = Ledger(project)
+        return _ledgers[project]
+
+
+def forget_ledger(project: str) -> None:
+    with _ledgers_lock:
+        _ledgers.pop(project, None)
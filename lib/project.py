@@ -2,36 +2,534 @@ import logging
 import os
 import shutil
 import subprocess
+import time
 from yaspin import yaspin
-from globals import app_state
-from graphs.planner import planner, Plan
+from globals import app_state, current_project
+from graphs.planner import planner_graph, Plan, PlanTask
 from graphs.task import task
 from graphs.self_heal import healer
+from lib.scheduler import run_scheduled, tasks_conflict
+from lib.jobs import Job, JobCancelled
+from lib.template import copy_template
+from lib.store import link_project_packages
+from lib.dependencies import dependency_queue
+from lib.ledger import forget_ledger, ledger_actor, project_ledger
+from lib.project_index import (
+    forget_index,
+    project_index,
+    refresh_index,
+    update_index,
+)
+from lib.runs import GenerationRun, close_run, load_run, start_run
+from lib.prompts import (
+    changed_routes,
+    hash_prompts,
+    load_prompt_hashes,
+    read_prompts,
+    save_prompt_hashes,
+)
+from lib.checkers import (
+    changed_since_green,
+    format_lint,
+    get_lint_worker,
+    get_type_checker,
+    mark_green,
+    notify_write,
+)
+from lib.snapshots import restore_snapshot, take_snapshot
+from lib.journal import Journal, journaled, write_file
+from lib.diagnostics import (
+    Diagnostic,
+    format_diagnostics,
+    group_by_file,
+    parse_diagnostics,
+)
+from lib.fix_memory import apply_patch, fingerprint, make_patch
+from lib.dev_servers import dev_servers
+from lib.read_cache import read_lines
 from langchain.messages import HumanMessage
+from langchain_core.messages import AIMessageChunk
 
+# streamed tokens are batched into one job event per interval (seconds)
+TOKEN_FLUSH_INTERVAL = 0.1
+TOOL_ARG_PREVIEW = 200
 
-# TODO: generate a README using the planner's output
-def generate_project():
-    logging.info(f"Opening project {app_state.current_project}")
 
-    if "prompts" not in os.listdir(app_state.current_project):
+def step(spinner, job: Job, stage: str, message: str, **data) -> None:
+    """Writes a progress line under the spinner and publishes it to the job's event stream."""
+    spinner.write(message)
+    job.emit(stage, message, **data)
+
+
+def run_graph(
+    graph, graph_input: dict, job: Job, source: str, config: dict | None = None
+) -> dict:
+    """
+    Runs a compiled graph to completion, checking for cancellation after every step.
+    Model tokens and tool calls are published to the job as they are produced, labelled
+    with source, so clients see output long before a model turn finishes.
+    For a checkpointed graph, config names the thread: a thread that already finished
+    returns its final state and an interrupted one continues from its last checkpoint.
+    """
+    job.check_cancelled()
+    if config is not None:
+        snapshot = graph.get_state(config)
+        if snapshot.values and not snapshot.next:
+            return snapshot.values
+        if snapshot.next:
+            graph_input = None
+    state = None
+    tokens: list[str] = []
+    last_flush = time.monotonic()
+
+    def flush_tokens(node: str = "") -> None:
+        nonlocal last_flush
+        if tokens:
+            job.emit("token", "".join(tokens), source=source, node=node)
+            tokens.clear()
+        last_flush = time.monotonic()
+
+    for mode, chunk in graph.stream(
+        graph_input, config, stream_mode=["values", "updates", "messages"]
+    ):
+        if mode == "messages":
+            message, metadata = chunk
+            if isinstance(message, AIMessageChunk) and isinstance(message.content, str):
+                tokens.append(message.content)
+                if time.monotonic() - last_flush >= TOKEN_FLUSH_INTERVAL:
+                    flush_tokens(metadata.get("langgraph_node", ""))
+        elif mode == "updates":
+            flush_tokens()
+            for update in chunk.values():
+                for message in (update or {}).get("messages", []):
+                    for tool_call in getattr(message, "tool_calls", None) or []:
+                        job.emit(
+                            "tool_call",
+                            tool_call["name"],
+                            source=source,
+                            args={
+                                key: str(value)[:TOOL_ARG_PREVIEW]
+                                for key, value in tool_call.get("args", {}).items()
+                            },
+                        )
+        else:
+            state = chunk
+            job.check_cancelled()
+    flush_tokens()
+    return state
+
+
+def flush_dependencies(spinner, job: Job) -> None:
+    """Applies the dependency changes queued since the last flush as one npm transaction."""
+    queue = dependency_queue(current_project())
+    if not queue.pending:
+        return
+    step(spinner, job, "dependencies", "Installing queued dependencies...")
+    step(spinner, job, "dependencies", queue.flush())
+
+
+VERIFY_TIERS = {"typecheck": "Type check", "lint": "Lint", "build": "Build"}
+
+
+def verify(spinner, job: Job, project: str, attempt: str) -> tuple[str, str] | None:
+    """
+    Checks the project cheapest tier first and stops at the first failure:
+    incremental type check, then lint of the files changed since the last green state,
+    then the full production build. Returns (tier, error output), or None when all pass.
+    """
+    step(
+        spinner, job, "build", f"Type checking (attempt {attempt})...", tier="typecheck"
+    )
+    try:
+        error_count, diagnostics = get_type_checker(project).check()
+        if error_count:
+            return "typecheck", "\n".join(diagnostics)
+    except (RuntimeError, OSError) as e:
+        logging.warning(f"Skipping type check tier: {str(e)}")
+
+    changed = changed_since_green(project)
+    if changed:
+        step(
+            spinner,
+            job,
+            "build",
+            f"Linting {len(changed)} changed files...",
+            tier="lint",
+        )
         try:
-            prompts_dir = f"{app_state.current_project}/prompts"
+            result = get_lint_worker(project).lint(changed)
+            if result["errorCount"]:
+                return "lint", format_lint(result)
+        except (RuntimeError, OSError) as e:
+            logging.warning(f"Skipping lint tier: {str(e)}")
+
+    # next build reuses .next/cache from earlier attempts, so nothing here may clear .next
+    step(spinner, job, "build", f"Building (attempt {attempt})...", tier="build")
+    try:
+        subprocess.run(
+            "npm run build",
+            capture_output=True,
+            text=True,
+            cwd=project,
+            shell=True,
+            check=True,
+        )
+    except subprocess.CalledProcessError as e:
+        return "build", e.stderr or e.stdout or "Unknown error"
+
+    mark_green(project)
+    return None
+
+
+def sync_restored(project: str, paths: list[str]) -> None:
+    """Tells the checkers, the ledger and the index about files put back by a rollback."""
+    for rel_path in paths:
+        notify_write(project, rel_path)
+    project_ledger(project).resync(paths)
+    update_index(project, paths)
+
+
+def roll_back(
+    spinner, job: Job, project: str, snapshot_id: str, paths: list[str], message: str
+) -> None:
+    """Restores paths from a snapshot, keeping the checkers and the ledger in step."""
+    changed = restore_snapshot(project, snapshot_id, paths)
+    sync_restored(project, changed)
+    step(spinner, job, "rollback", message, snapshot=snapshot_id, paths=changed)
+
+
+def roll_back_journal(spinner, job: Job, journal: Journal, message: str) -> None:
+    restored = journal.rollback()
+    sync_restored(journal.project, restored)
+    step(spinner, job, "rollback", message, paths=restored)
+
+
+def task_impossible(state: dict) -> bool:
+    """True when an agent's final answer rejects its task (see TASK_SYSTEM_PROMPT)."""
+    messages = state.get("messages") or []
+    return bool(messages) and "TASK IMPOSSIBLE" in str(messages[-1].content)
+
+
+def task_prompt(plan_task: PlanTask) -> str:
+    prompt = plan_task.description
+    if plan_task.writes:
+        prompt += f"\n\nOnly create or modify: {', '.join(plan_task.writes)}"
+    if plan_task.reads:
+        prompt += f"\nYou may read: {', '.join(plan_task.reads)}"
+    return prompt
+
+
+def run_phase(
+    spinner, job: Job, run: GenerationRun, phase: str, plan_tasks: list[PlanTask]
+) -> None:
+    """
+    Runs one plan phase, executing tasks whose paths do not conflict at the same time.
+    Each task is given only the ledger entries for the paths it declares.
+    Tasks the run already completed are skipped and each finished task is recorded.
+    Every task writes through its own journal: a task that raises or answers
+    TASK IMPOSSIBLE has its changes rolled back, and a failed task is retried from
+    scratch when the run is resumed.
+    """
+    project = current_project()
+    ledger = project_ledger(project)
+    keys = {
+        id(plan_task): run.task_key(phase, index, plan_task.description)
+        for index, plan_task in enumerate(plan_tasks)
+    }
+    pending = [t for t in plan_tasks if not run.is_completed(keys[id(t)])]
+    if len(pending) < len(plan_tasks):
+        step(
+            spinner,
+            job,
+            "task",
+            f"Skipping {len(plan_tasks) - len(pending)} tasks completed earlier",
+            phase=phase,
+            state="skipped",
+        )
+
+    def run_task(plan_task: PlanTask) -> None:
+        key = keys[id(plan_task)]
+        step(
+            spinner,
+            job,
+            "task",
+            f"Started: {plan_task.description}",
+            phase=phase,
+            state="started",
+        )
+        take_snapshot(project, f"before task: {plan_task.description}")
+        with journaled(project, plan_task.description) as journal:
+            try:
+                with ledger_actor(plan_task.description):
+                    state = run_graph(
+                        run.checkpointed(task),
+                        {
+                            "messages": [HumanMessage(task_prompt(plan_task))],
+                            "carry": ledger.render(plan_task.reads + plan_task.writes),
+                        },
+                        job,
+                        plan_task.description,
+                        run.config(f"task:{key}:{run.attempt(key)}"),
+                    )
+            except JobCancelled:
+                # cancelled work is kept so a resume continues from the checkpoint
+                journal.commit()
+                raise
+            except Exception:
+                roll_back_journal(
+                    spinner,
+                    job,
+                    journal,
+                    f"Undid the changes of failed task: {plan_task.description}",
+                )
+                run.retry(key)
+                raise
+
+            if task_impossible(state):
+                # the healer picks up whatever the task could not do after the build
+                roll_back_journal(
+                    spinner,
+                    job,
+                    journal,
+                    f"Task rejected, undid its changes: {plan_task.description}",
+                )
+                touched = []
+            else:
+                touched = journal.commit()
+        run.complete(key)
+        step(
+            spinner,
+            job,
+            "task",
+            f"Finished: {plan_task.description}",
+            phase=phase,
+            state="finished",
+            paths=touched,
+        )
+
+    run_scheduled(pending, run_task, tasks_conflict, max_workers=app_state.task_workers)
+
+
+def heal_groups(project: str, error_msg: str) -> dict[str, list[Diagnostic]]:
+    """Diagnostics of a failed check grouped by project file, files outside the project dropped."""
+    return {
+        file: diagnostics
+        for file, diagnostics in group_by_file(
+            parse_diagnostics(error_msg, project)
+        ).items()
+        if not file.startswith(("..", "node_modules/"))
+        and os.path.isfile(os.path.join(project, file))
+    }
+
+
+def heal_prompt(
+    project: str,
+    tier: str,
+    file: str | None,
+    diagnostics: list[Diagnostic],
+    error_msg: str,
+) -> str:
+    if file is None:
+        return f"{VERIFY_TIERS[tier]} failed with the following error. Analyze the error, identify the problematic files, and fix them:\n\n{error_msg}"
+    return (
+        f"{VERIFY_TIERS[tier]} failed with the following errors in {file}. "
+        f"Fix them, changing other files only where the cause lies there:\n\n"
+        f"{format_diagnostics(diagnostics)}\n\n"
+        f"Current content of {file}:\n\n"
+        f"{read_lines(os.path.join(project, file))}"
+    )
+
+
+def write_known_fix(project: str, contents: dict[str, str]) -> None:
+    """Writes a replayed patch the way write_project_file would, keeping the ledger and index in step."""
+    ledger = project_ledger(project)
+    for rel_path, content in contents.items():
+        write_file(project, rel_path, content)
+        notify_write(project, rel_path)
+        ledger.record_write(rel_path, content, False)
+    update_index(project, list(contents))
+
+
+def heal(
+    spinner,
+    job: Job,
+    project: str,
+    tier: str,
+    error_msg: str,
+    heal_round: str,
+    tried: set[str],
+) -> list[tuple[str, str, dict]]:
+    """
+    Runs one heal round. Each file with diagnostics gets a heal job that sees only its
+    own errors and content; output that names no project file goes to a single job with
+    the raw error. A job first replays the best-ranked known patch for its errors that
+    applies and that this run has not tried on the file yet (tried is updated), and
+    only calls the healer when there is none. Jobs for different files run at the same
+    time, except jobs for files importing one another, since fixing one often means
+    editing the other. Each job writes through its own journal, so a failing job only
+    undoes its own changes. Returns (file, fingerprint, patch) for every patch the round
+    applied, for record_heal_outcomes. Raises when every job failed.
+    """
+    ledger = project_ledger(project)
+    index = project_index(project)
+    memory = app_state.fix_memory
+    groups: dict[str | None, list[Diagnostic]] = heal_groups(project, error_msg) or {
+        None: []
+    }
+    if len(groups) > 1:
+        step(spinner, job, "heal", f"Healing {len(groups)} files in parallel...")
+
+    def imports(file: str) -> list[str]:
+        return index.files.get(file, {}).get("imports", [])
+
+    def related(a: str | None, b: str | None) -> bool:
+        if a is None or b is None:
+            return True
+        return b in imports(a) or a in imports(b)
+
+    def run_job(file: str | None) -> tuple[bool, tuple | None]:
+        diagnostics = groups[file]
+        label = heal_round if file is None else f"{heal_round}: {file}"
+        trigger = format_diagnostics(diagnostics[:1]) if diagnostics else error_msg
+        trigger = (
+            f"{VERIFY_TIERS[tier]}: {(trigger.strip().splitlines() or [''])[0][:200]}"
+        )
+        key = fingerprint(diagnostics) if file is not None else None
+
+        if memory is not None and key is not None:
+            for patch in memory.candidates(key):
+                tried_key = f"{file}\0{memory.patch_key(patch)}"
+                contents = (
+                    None if tried_key in tried else apply_patch(project, file, patch)
+                )
+                if contents is None:
+                    continue
+                tried.add(tried_key)
+                memory.offered()
+                with journaled(project, label), ledger_actor(heal_round):
+                    write_known_fix(project, contents)
+                ledger.record_fix(f"{trigger} (known fix)", sorted(contents))
+                step(
+                    spinner,
+                    job,
+                    "heal",
+                    f"Applied a known fix to {file}",
+                    paths=sorted(contents),
+                )
+                return True, (file, key, patch)
+
+        with journaled(project, label) as journal:
+            try:
+                with ledger_actor(heal_round):
+                    run_graph(
+                        healer,
+                        {
+                            "messages": [
+                                HumanMessage(
+                                    heal_prompt(
+                                        project, tier, file, diagnostics, error_msg
+                                    )
+                                )
+                            ],
+                            "carry": ledger.render(
+                                [file]
+                                if file is not None
+                                else ledger.mentioned_paths(error_msg)
+                            ),
+                        },
+                        job,
+                        label,
+                    )
+            except JobCancelled:
+                raise
+            except Exception as e:
+                logging.error(f"Healer failed on {label}: {str(e)}")
+                roll_back_journal(
+                    spinner, job, journal, f"Undid the changes of failed {label}"
+                )
+                return False, None
+            originals = journal.originals()
+            fixed = journal.commit()
+        if not fixed:
+            return True, None
+        ledger.record_fix(trigger, fixed)
+        patch = make_patch(project, file, originals) if key is not None else None
+        return True, (file, key, patch) if patch else None
+
+    results = run_scheduled(
+        list(groups), run_job, related, max_workers=app_state.task_workers
+    )
+    if not any(ok for ok, _ in results):
+        raise RuntimeError(f"all {len(groups)} heal jobs failed")
+    return [attempt for _, attempt in results if attempt is not None]
+
+
+def record_heal_outcomes(
+    project: str,
+    attempts: list[tuple[str, str, dict]],
+    failure: tuple[str, str] | None,
+    rolled_back: bool,
+) -> None:
+    """
+    Tells the fix memory whether the patches of the last heal round worked: a patch
+    worked when the next check no longer shows the same errors in its file and the round
+    was not undone for breaking a cheaper check.
+    """
+    if app_state.fix_memory is None or not attempts:
+        return
+    remaining = heal_groups(project, failure[1]) if failure is not None else {}
+    for file, key, patch in attempts:
+        still_failing = file in remaining and fingerprint(remaining[file]) == key
+        app_state.fix_memory.record(
+            key, patch, success=not (still_failing or rolled_back)
+        )
+
+
+# TODO: generate a README using the planner's output
+def generate_project(job: Job, resume: bool = False, incremental: bool = False):
+    """
+    Generates the current project. With resume, continues the project's last run: the saved
+    plan is reused and only unfinished tasks run, followed by the verify and heal loop.
+    With incremental, only the routes whose prompts changed since the last successful
+    generation are re-planned (common tasks only when the root prompt changed).
+    """
+    project = current_project()
+    logging.info(f"Opening project {project}")
+
+    fresh = "prompts" not in os.listdir(project)
+    if resume:
+        run = load_run(project)
+        if run is None:
+            raise RuntimeError("Project has no generation run to resume")
+    else:
+        # a project generated before is re-planned on top of its current files, as long as
+        # its last run got as far as copying the template
+        previous = load_run(project)
+        if previous is not None:
+            scaffolded = previous.scaffolded
+        else:
+            scaffolded = os.path.exists(f"{project}/package.json")
+        run = start_run(project, scaffolded=scaffolded)
+    run.update(status="running")
+
+    try:
+        if fresh:
+            prompts_dir = f"{project}/prompts"
             os.makedirs(prompts_dir, exist_ok=True)
 
-            root_index = f"{app_state.current_project}/index.txt"
+            root_index = f"{project}/index.txt"
             if os.path.exists(root_index):
                 try:
                     shutil.move(root_index, prompts_dir)
                 except (PermissionError, OSError) as e:
                     logging.error(f"Failed to move index.txt: {e}")
-                    return f"Failed to move index.txt: {e}"
+                    raise RuntimeError(f"Failed to move index.txt: {e}")
 
-            for item in os.listdir(app_state.current_project):
+            for item in os.listdir(project):
                 try:
                     if item.startswith("."):
                         continue
-                    item_path = f"{app_state.current_project}/{item}"
+                    item_path = f"{project}/{item}"
 
                     if not os.path.isdir(item_path):
                         continue
@@ -43,158 +541,230 @@ def generate_project():
                     logging.error(f"Failed to move folder '{item}': {e}")
                     continue
 
+        if not run.scaffolded:
             with yaspin(
-                color="yellow", text="Creating Next.js project with default config..."
+                color="yellow", text="Creating Next.js project from template..."
             ) as spinner:
+                job.emit("scaffold", "Creating Next.js project from template...")
                 try:
-                    env = os.environ.copy()
-                    env["CI"] = "1"
-                    subprocess.run(
-                        f"npx create-next-app@latest {app_state.current_project.split('/')[-1]} --yes --tailwind --eslint --src-dir --app --ts",
-                        capture_output=True,
-                        text=True,
-                        cwd=app_state.current_project,
-                        shell=True,
-                        check=True,
-                        env=env,
-                    )
-                    for item in os.listdir(
-                        f"{app_state.current_project}/{app_state.current_project.split('/')[-1]}"
-                    ):
-                        shutil.move(
-                            f"{app_state.current_project}/{app_state.current_project.split('/')[-1]}/{item}",
-                            app_state.current_project,
-                        )
-                    os.rmdir(
-                        f"{app_state.current_project}/{app_state.current_project.split('/')[-1]}"
-                    )
+                    copy_template(project)
+                    take_snapshot(project, "scaffold")
+                    refresh_index(project)
+                    run.update(scaffolded=True)
                     spinner.ok("✅")
+                    job.emit("scaffold", "Project created")
                 except subprocess.CalledProcessError as e:
                     error_msg = e.stderr or e.stdout or "Unknown error"
                     logging.error(f"Project creation failed: {error_msg}")
-                    spinner.write(f"create-next-app exited with code {e.returncode}")
+                    step(
+                        spinner,
+                        job,
+                        "scaffold",
+                        f"create-next-app exited with code {e.returncode}",
+                    )
                     spinner.fail("❌")
-                    return f"Project creation failed: {error_msg}"
-
-        except FileNotFoundError as e:
-            logging.error(f"Project directory not found: {e}")
-            return f"Project directory not found: {e}"
-        except PermissionError as e:
-            logging.error(f"Permission denied: {e}")
-            return f"Permission denied: {e}"
-        except Exception as e:
-            logging.error(f"Unexpected error during project creation: {e}")
-            return f"Unexpected error: {e}"
+                    raise RuntimeError(f"Project creation failed: {error_msg}")
+
+    except RuntimeError:
+        raise
+    except FileNotFoundError as e:
+        logging.error(f"Project directory not found: {e}")
+        raise RuntimeError(f"Project directory not found: {e}")
+    except PermissionError as e:
+        logging.error(f"Permission denied: {e}")
+        raise RuntimeError(f"Permission denied: {e}")
+    except Exception as e:
+        logging.error(f"Unexpected error during project creation: {e}")
+        raise RuntimeError(f"Unexpected error: {e}")
+
+    if run.prompt_hashes is None:
+        hashes = hash_prompts(read_prompts(project))
+        previous = load_prompt_hashes(project) if incremental else None
+        routes = changed_routes(previous, hashes) if previous is not None else None
+        run.update(prompt_hashes=hashes, routes=routes)
+    if run.routes == []:
+        job.emit("plan", "No prompts changed since the last generation")
+        run.update(status="succeeded")
+        return
 
-    summary: str = ""
     with yaspin(color="yellow", text="Generating site...") as spinner:
-        spinner.write("Drafting plan...")
+        if run.routes is None:
+            step(spinner, job, "plan", "Drafting plan...")
+        else:
+            step(
+                spinner,
+                job,
+                "plan",
+                f"Drafting plan for changed routes: {', '.join(run.routes)}",
+                routes=run.routes,
+            )
         try:
-            plan: Plan = planner.invoke({})
+            if run.plan is None:
+                # a checkpoint restored from disk may hold the plan as a plain dict
+                plan = Plan.model_validate(
+                    run_graph(
+                        run.checkpointed(planner_graph),
+                        {"messages": [], "plan": None, "routes": run.routes},
+                        job,
+                        "planner",
+                        run.config("planner"),
+                    )["plan"]
+                )
+                if run.routes is not None and "/" not in run.routes:
+                    plan = plan.model_copy(update={"common_tasks": []})
+                run.update(plan=plan.model_dump())
+            else:
+                plan = Plan.model_validate(run.plan)
+                step(spinner, job, "plan", "Resuming with the saved plan")
+        except JobCancelled:
+            spinner.fail("❌")
+            raise
         except Exception as e:
             logging.error(f"Planner failed with: {str(e)}")
             spinner.fail("❌")
             raise RuntimeError("Planner failed")
 
-        spinner.write("Executing tasks...")
+        step(
+            spinner,
+            job,
+            "plan",
+            "Executing tasks...",
+            common_tasks=[t.description for t in plan.common_tasks],
+            backend_tasks=[t.description for t in plan.backend_tasks],
+            frontend_tasks=[t.description for t in plan.frontend_tasks],
+        )
         try:
-            for common_task in plan.common_tasks:
-                summary = task.invoke(
-                    {"messages": [HumanMessage(common_task)], "carry": summary}
-                )["carry"]
-            for backend_task in plan.backend_tasks:
-                summary = task.invoke(
-                    {"messages": [HumanMessage(backend_task)], "carry": summary}
-                )["carry"]
-            for frontend_task in plan.frontend_tasks:
-                summary = task.invoke(
-                    {"messages": [HumanMessage(frontend_task)], "carry": summary}
-                )["carry"]
+            # common tasks touch shared config, so they finish before any route work starts
+            run_phase(spinner, job, run, "common", plan.common_tasks)
+            flush_dependencies(spinner, job)
+            run_phase(
+                spinner, job, run, "site", plan.backend_tasks + plan.frontend_tasks
+            )
+            flush_dependencies(spinner, job)
             spinner.ok("✅")
+        except JobCancelled:
+            spinner.fail("❌")
+            raise
         except Exception as e:
             logging.error(f"Task failed with: {str(e)}")
             spinner.fail("❌")
             raise RuntimeError("Task failed")
 
+    tiers = list(VERIFY_TIERS)
     with yaspin(color="red", text="Testing build...") as spinner:
         max_tries = 3
         tries = 0
+        # (snapshot before the heal, heal round, failure it was fixing, patches it applied)
+        last_heal = None
+        # known patches already replayed this run, so a patch that did not help is not retried
+        tried: set[str] = set()
 
         while tries < max_tries:
-            try:
-                subprocess.run(
-                    "npm run build",
-                    capture_output=True,
-                    text=True,
-                    cwd=app_state.current_project,
-                    shell=True,
-                    check=True,
-                )
+            job.check_cancelled()
+            # dependency changes queued by the healer land here, before the next build
+            flush_dependencies(spinner, job)
+            link_project_packages(project)
+            failure = verify(spinner, job, project, f"{tries + 1}/{max_tries}")
+            rolled_back = False
+            if failure is not None and last_heal is not None:
+                snapshot_id, heal_round, healed_failure, _ = last_heal
+                # failing a cheaper tier than before means the heal broke something that passed
+                if tiers.index(failure[0]) < tiers.index(healed_failure[0]):
+                    roll_back(
+                        spinner,
+                        job,
+                        project,
+                        snapshot_id,
+                        project_ledger(project).files_by(heal_round),
+                        f"Undid {heal_round}: it broke the {VERIFY_TIERS[failure[0]].lower()}",
+                    )
+                    failure = healed_failure
+                    rolled_back = True
+            if last_heal is not None:
+                record_heal_outcomes(project, last_heal[3], failure, rolled_back)
+            last_heal = None
+            if failure is None:
                 spinner.ok("✅")
+                job.emit("build", "Build succeeded", state="succeeded")
                 logging.info("Build succeeded")
-                return summary
+                save_prompt_hashes(project, run.prompt_hashes)
+                take_snapshot(project, "build succeeded")
+                run.update(status="succeeded")
+                return
 
-            except subprocess.CalledProcessError as e:
-                tries += 1
-                error_msg = e.stderr or e.stdout or "Unknown error"
-
-                spinner.write(f"Build failed (attempt {tries}/{max_tries})")
-                logging.error(f"Build error: {error_msg}")
-
-                if tries >= max_tries:
-                    spinner.fail("❌")
-                    logging.error("Could not produce working build after all retries")
-                    raise RuntimeError(
-                        f"Could not produce working build after {max_tries} attempts. Last error: {error_msg}"
-                    )
-
-                spinner.write("Analyzing build errors and applying fixes...")
-                try:
-                    heal_result = healer.invoke(
-                        {
-                            "messages": [
-                                HumanMessage(
-                                    f"Build failed with the following error. Analyze the error, identify the problematic files, and fix them:\n\n{error_msg}"
-                                )
-                            ],
-                            "carry": summary,
-                        }
-                    )
+            tier, error_msg = failure
+            tries += 1
+            step(
+                spinner,
+                job,
+                "build",
+                f"{VERIFY_TIERS[tier]} failed (attempt {tries}/{max_tries})",
+                state="failed",
+                tier=tier,
+            )
+            logging.error(f"{VERIFY_TIERS[tier]} error: {error_msg}")
 
-                    summary = heal_result.get("carry", summary)
+            if tries >= max_tries:
+                spinner.fail("❌")
+                logging.error("Could not produce working build after all retries")
+                raise RuntimeError(
+                    f"Could not produce working build after {max_tries} attempts. Last error: {error_msg}"
+                )
 
-                    spinner.write(
-                        f"Applied fixes. Retrying build ({max_tries - tries} attempts remaining)..."
-                    )
+            step(spinner, job, "heal", "Analyzing build errors and applying fixes...")
+            heal_round = f"heal {tries}"
+            snapshot_id = take_snapshot(project, f"before {heal_round}")
+            try:
+                attempts = heal(
+                    spinner, job, project, tier, error_msg, heal_round, tried
+                )
+                last_heal = (snapshot_id, heal_round, failure, attempts)
+                step(
+                    spinner,
+                    job,
+                    "heal",
+                    f"Applied fixes. Retrying build ({max_tries - tries} attempts remaining)...",
+                )
 
-                except Exception as heal_error:
-                    logging.error(f"Healer failed: {str(heal_error)}")
-                    spinner.write(
-                        f"Warning: Auto-fix attempt failed: {str(heal_error)}"
-                    )
+            except JobCancelled:
+                spinner.fail("❌")
+                raise
+            except Exception as heal_error:
+                logging.error(f"Healer failed: {str(heal_error)}")
+                step(
+                    spinner,
+                    job,
+                    "heal",
+                    f"Warning: Auto-fix attempt failed: {str(heal_error)}",
+                )
 
         spinner.fail("❌")
         raise RuntimeError("Build healing loop exited unexpectedly")
 
 
 def revert_project():
-    logging.info(f"Reverting project {app_state.current_project} to original state...")
+    project = current_project()
+    logging.info(f"Reverting project {project} to original state...")
+    dev_servers.stop(project)
+    forget_ledger(project)
+    forget_index(project)
+    close_run(project)
     try:
-        for item in os.listdir(app_state.current_project):
+        for item in os.listdir(project):
             if not item == "prompts":
-                path = f"{app_state.current_project}/{item}"
+                path = f"{project}/{item}"
                 if os.path.isdir(path):
                     shutil.rmtree(path)
                 else:
                     os.remove(path)
 
-        for item in os.listdir(f"{app_state.current_project}/prompts"):
+        for item in os.listdir(f"{project}/prompts"):
             shutil.move(
-                f"{app_state.current_project}/prompts/{item}",
-                f"{app_state.current_project}",
+                f"{project}/prompts/{item}",
+                project,
             )
 
-        os.rmdir(f"{app_state.current_project}/prompts")
+        os.rmdir(f"{project}/prompts")
     except FileNotFoundError as e:
         logging.error(f"Project directory not found: {e}")
         return f"Project directory not found: {e}"
@@ -204,17 +774,3 @@ def revert_project():
     except Exception as e:
         logging.error(f"Unexpected error during project revert: {e}")
         return f"Unexpected error: {e}"
-
-
-def project_dev_server():
-    logging.info(
-        f"Running project {app_state.current_project.split('/')[-1]} dev server"
-    )
-
-    subprocess.run(
-        "npm run dev",
-        text=True,
-        cwd=app_state.current_project,
-        shell=True,
-        check=True,
-    )
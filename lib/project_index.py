@@ -0,0 +1,253 @@
+import logging
+import os
+import posixpath
+import re
+from threading import Lock
+from lib.ledger import STATE_DIR, exported_symbols
+from lib.read_cache import MMAP_THRESHOLD, read_cache
+from lib.scheduler import paths_overlap
+
+SOURCE_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs")
+# never indexed: installed packages, build output and generator state
+SKIPPED_DIRS = {"node_modules", ".next", ".git", STATE_DIR}
+# static imports and re-exports, dynamic import() and require()
+IMPORT_RE = re.compile(
+    r"""(?:^|[\s;])(?:import|export)\s+(?:type\s+)?(?:[\w*${},\s]+?\s+from\s+)?["']([^"'\n]+)["']"""
+    r"""|\b(?:import|require)\s*\(\s*["']([^"'\n]+)["']\s*\)"""
+)
+# the @/* alias create-next-app sets up with --src-dir
+ALIAS_PREFIX = ("@/", "src/")
+# app router files that make a folder a route
+ROUTE_FILES = {"page", "route"}
+
+MAX_TREE_ENTRIES = 400
+MAX_GREP_LINE = 200
+
+
+def _route_of(rel_path: str) -> str | None:
+    """The URL route a src/app page or route handler serves, or None for other files."""
+    parts = rel_path.split("/")
+    if parts[:2] != ["src", "app"] or len(parts) < 3:
+        return None
+    name, ext = os.path.splitext(parts[-1])
+    if name not in ROUTE_FILES or ext not in SOURCE_EXTENSIONS:
+        return None
+    # route groups and parallel route slots do not show up in the URL
+    segments = [s for s in parts[2:-1] if not (s.startswith("(") and s.endswith(")"))]
+    segments = [s for s in segments if not s.startswith("@")]
+    return "/" + "/".join(segments)
+
+
+class ProjectIndex:
+    """
+    In-memory index of a project's source tree: every file, the symbols each TS/JS module
+    exports, the import graph and the routes under src/app. Built once per project and
+    updated file by file as agents write, so exploring the project does not take a round
+    trip per directory.
+    """
+
+    def __init__(self, project: str):
+        self.project = project
+        self._lock = Lock()
+        # rel path -> {"exports", "specifiers", "imports"}; imports are the specifiers
+        # resolved to project paths, or to package names for bare specifiers
+        self.files: dict[str, dict] = {}
+        self.routes: dict[str, str] = {}
+        self._importers: dict[str, set[str]] = {}
+        self.build()
+
+    def build(self) -> None:
+        files = []
+        for dirpath, dirnames, filenames in os.walk(self.project):
+            dirnames[:] = sorted(d for d in dirnames if d not in SKIPPED_DIRS)
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                files.append(os.path.relpath(path, self.project).replace(os.sep, "/"))
+        with self._lock:
+            self.files.clear()
+            self.routes.clear()
+            self._importers.clear()
+            for rel_path in files:
+                self._index_file(rel_path)
+            self._link_all()
+
+    def _read(self, rel_path: str) -> str | None:
+        path = os.path.join(self.project, rel_path)
+        try:
+            st = os.stat(path)
+            if st.st_size > MMAP_THRESHOLD:
+                return None
+            return read_cache.get(path, st).decode("utf-8", errors="replace")
+        except OSError as e:
+            logging.error(f"Indexing {path} failed with: {e}")
+            return None
+
+    def _index_file(self, rel_path: str) -> None:
+        entry = {"exports": [], "specifiers": [], "imports": []}
+        if rel_path.endswith(SOURCE_EXTENSIONS):
+            source = self._read(rel_path)
+            if source is not None:
+                entry["exports"] = exported_symbols(source)
+                entry["specifiers"] = list(
+                    dict.fromkeys(a or b for a, b in IMPORT_RE.findall(source))
+                )
+        self.files[rel_path] = entry
+        route = _route_of(rel_path)
+        if route is not None:
+            self.routes[rel_path] = route
+
+    def _resolve(self, importer: str, specifier: str) -> str:
+        if specifier.startswith(ALIAS_PREFIX[0]):
+            base = ALIAS_PREFIX[1] + specifier[len(ALIAS_PREFIX[0]) :]
+        elif specifier.startswith("."):
+            base = posixpath.normpath(
+                posixpath.join(posixpath.dirname(importer), specifier)
+            )
+        else:
+            # bare specifiers name a package: "next/link" -> "next", "@radix-ui/x/y" -> "@radix-ui/x"
+            parts = specifier.split("/")
+            return "/".join(parts[:2] if specifier.startswith("@") else parts[:1])
+        candidates = [base]
+        candidates += [base + ext for ext in SOURCE_EXTENSIONS]
+        candidates += [f"{base}/index{ext}" for ext in SOURCE_EXTENSIONS]
+        return next((c for c in candidates if c in self.files), base)
+
+    def _link(self, rel_path: str) -> None:
+        entry = self.files[rel_path]
+        entry["imports"] = list(
+            dict.fromkeys(self._resolve(rel_path, s) for s in entry["specifiers"])
+        )
+        for target in entry["imports"]:
+            self._importers.setdefault(target, set()).add(rel_path)
+
+    def _link_all(self) -> None:
+        for rel_path in self.files:
+            self._link(rel_path)
+
+    def update(self, rel_paths: list[str]) -> None:
+        """Re-indexes files (or whole directories) that were written, moved or deleted."""
+        with self._lock:
+            for rel_path in rel_paths:
+                rel_path = rel_path.strip().strip("/")
+                for stale in [p for p in self.files if paths_overlap(p, rel_path)]:
+                    del self.files[stale]
+                    self.routes.pop(stale, None)
+                path = os.path.join(self.project, rel_path)
+                if os.path.isfile(path):
+                    self._index_file(rel_path)
+                elif os.path.isdir(path):
+                    for dirpath, dirnames, filenames in os.walk(path):
+                        dirnames[:] = [d for d in dirnames if d not in SKIPPED_DIRS]
+                        for name in filenames:
+                            self._index_file(
+                                os.path.relpath(
+                                    os.path.join(dirpath, name), self.project
+                                ).replace(os.sep, "/")
+                            )
+            # a new file can change how other modules' imports resolve, so relink everything;
+            # it is a pass over in-memory lists, not over the disk
+            self._importers.clear()
+            self._link_all()
+
+    def find_symbol(self, name: str) -> list[tuple[str, str]]:
+        """(path, symbol) for exports named name, or containing it when none match exactly."""
+        with self._lock:
+            exact = [
+                (p, s) for p, e in self.files.items() for s in e["exports"] if s == name
+            ]
+            if exact:
+                return exact
+            needle = name.lower()
+            return [
+                (p, s)
+                for p, e in self.files.items()
+                for s in e["exports"]
+                if needle in s.lower()
+            ]
+
+    def who_imports(self, target: str) -> list[str]:
+        """Files importing a project module (by path, with or without extension) or a package."""
+        target = target.strip().strip("/")
+        with self._lock:
+            if target not in self._importers:
+                resolved = self._resolve("", f"./{target}")
+                target = (
+                    resolved if resolved in self.files else self._resolve("", target)
+                )
+            return sorted(self._importers.get(target, set()))
+
+    def tree(self, rel_path: str = "", depth: int = 3) -> list[str]:
+        """Indented listing of rel_path down to depth levels, pages marked with their route."""
+        rel_path = rel_path.strip().strip("/")
+        prefix = f"{rel_path}/" if rel_path else ""
+        with self._lock:
+            paths = sorted(p for p in self.files if p.startswith(prefix))
+            routes = dict(self.routes)
+        lines, seen = [], set()
+        for path in paths:
+            parts = path[len(prefix) :].split("/")
+            for level in range(min(len(parts), depth)):
+                node = "/".join(parts[: level + 1])
+                if node in seen:
+                    continue
+                seen.add(node)
+                is_dir = level < len(parts) - 1
+                line = "  " * level + parts[level] + ("/" if is_dir else "")
+                if not is_dir and path in routes:
+                    line += f"  -> {routes[path]}"
+                lines.append(line)
+        return lines
+
+    def grep(
+        self, pattern: re.Pattern, rel_path: str = "", max_results: int = 50
+    ) -> tuple[list[str], bool]:
+        """'path:line: text' matches of pattern under rel_path, and whether there were more."""
+        rel_path = rel_path.strip().strip("/")
+        with self._lock:
+            paths = sorted(p for p in self.files if paths_overlap(p, rel_path))
+        matches = []
+        for path in paths:
+            source = self._read(path)
+            if source is None or "\0" in source:
+                continue
+            for number, line in enumerate(source.splitlines(), start=1):
+                if pattern.search(line):
+                    if len(matches) == max_results:
+                        return matches, True
+                    matches.append(f"{path}:{number}: {line.strip()[:MAX_GREP_LINE]}")
+        return matches, False
+
+
+_indexes: dict[str, ProjectIndex] = {}
+_indexes_lock = Lock()
+
+
+def project_index(project: str) -> ProjectIndex:
+    with _indexes_lock:
+        if project not in _indexes:
+            _indexes[project] = ProjectIndex(project)
+        return _indexes[project]
+
+
+def refresh_index(project: str) -> ProjectIndex:
+    """Rebuilds the project's index from disk, building it only once when it is new."""
+    with _indexes_lock:
+        index = _indexes.get(project)
+        if index is None:
+            index = _indexes[project] = ProjectIndex(project)
+            return index
+    index.build()
+    return index
+
+
+def update_index(project: str, rel_paths: list[str]) -> None:
+    """Keeps an already built index in step with changed paths; a no-op otherwise."""
+    with _indexes_lock:
+        index = _indexes.get(project)
+    if index is not None:
+        index.update(rel_paths)
+
+
+def forget_index(project: str) -> None:
+    with _indexes_lock:
+        _indexes.pop(project, None)
@@ -0,0 +1,67 @@
+import json
+import logging
+import os
+from hashlib import sha256
+from lib.ledger import STATE_DIR
+
+
+def read_prompts(project: str) -> dict[str, str]:
+    """
+    Non-empty prompts under the project's prompts/ folder, keyed by route:
+    prompts/index.txt is "/", prompts/about/team/index.txt is "/about/team".
+    """
+    prompts_dir = os.path.join(project, "prompts")
+    prompts = {}
+    for root, dirs, files in os.walk(prompts_dir):
+        dirs.sort()
+        if "index.txt" not in files:
+            continue
+        try:
+            with open(os.path.join(root, "index.txt"), "r", encoding="utf-8") as prompt:
+                content = prompt.read().strip()
+        except OSError as e:
+            logging.error(f"Error while reading prompts: {str(e)}")
+            continue
+        if content:
+            route = os.path.relpath(root, prompts_dir).replace(os.sep, "/")
+            prompts["/" if route == "." else f"/{route}"] = content
+    return prompts
+
+
+def hash_prompts(prompts: dict[str, str]) -> dict[str, str]:
+    return {
+        route: sha256(content.encode()).hexdigest()
+        for route, content in prompts.items()
+    }
+
+
+def _hashes_path(project: str) -> str:
+    return os.path.join(project, STATE_DIR, "prompts.json")
+
+
+def load_prompt_hashes(project: str) -> dict[str, str] | None:
+    """Prompt hashes of the last successful generation, or None if there was none."""
+    try:
+        with open(_hashes_path(project), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.error(f"Ignoring unreadable prompt hashes: {e}")
+        return None
+
+
+def save_prompt_hashes(project: str, hashes: dict[str, str]) -> None:
+    path = _hashes_path(project)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(hashes, file, indent=2, sort_keys=True)
+
+
+def changed_routes(previous: dict[str, str], current: dict[str, str]) -> list[str]:
+    """Routes whose prompt was added, edited or deleted since previous."""
+    return sorted(
+        route
+        for route in previous.keys() | current.keys()
+        if previous.get(route) != current.get(route)
+    )
@@ -0,0 +1,142 @@
+import mmap
+import os
+from collections import OrderedDict
+from threading import Lock
+
+# files larger than this are read through mmap instead of being cached whole
+MMAP_THRESHOLD = 256 * 1024
+DEFAULT_MAX_BYTES = int(os.getenv("UNLOVABLE_READ_MAX_BYTES", "100000"))
+
+
+class ReadCache:
+    """
+    In-process cache of small project files keyed on path, mtime and size, so the files
+    agents read again and again (layout.tsx, globals.css, configs) come from memory.
+    A file that changed on disk never matches its cached entry, and writes through the
+    agent tools also drop entries explicitly.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024**2):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[int, int, bytes]] = OrderedDict()
+        self._size = 0
+        self._lock = Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, path: str, st: os.stat_result) -> bytes:
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry[:2] == (st.st_mtime_ns, st.st_size):
+                self._entries.move_to_end(path)
+                self._counters["hits"] += 1
+                return entry[2]
+            self._counters["misses"] += 1
+
+        with open(path, "rb") as file:
+            data = file.read()
+
+        with self._lock:
+            self._drop(path)
+            self._entries[path] = (st.st_mtime_ns, st.st_size, data)
+            self._size += len(data)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self._counters["evictions"] += 1
+        return data
+
+    def _drop(self, path: str) -> None:
+        entry = self._entries.pop(path, None)
+        if entry:
+            self._size -= len(entry[2])
+
+    def invalidate(self, path: str) -> None:
+        """Drops path and, for a directory, everything cached under it."""
+        prefix = path.rstrip(os.sep) + os.sep
+        with self._lock:
+            for cached in [
+                p for p in self._entries if p == path or p.startswith(prefix)
+            ]:
+                self._drop(cached)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "bytes": self._size,
+            }
+
+
+read_cache = ReadCache()
+
+
+def _line_range(
+    buffer, start_line: int, end_line: int | None, max_bytes: int
+) -> tuple[bytes, int, bool]:
+    """
+    Returns (bytes of lines start_line..end_line capped at max_bytes, last line included,
+    whether more of the requested range was left out). Works on bytes and on mmaps.
+    """
+    size = len(buffer)
+    start = 0
+    line = 1
+    while line < start_line and start < size:
+        newline = buffer.find(b"\n", start)
+        start = size if newline == -1 else newline + 1
+        line += 1
+
+    end = start
+    last = start_line - 1
+    while end < size and (end_line is None or last < end_line):
+        newline = buffer.find(b"\n", end)
+        stop = size if newline == -1 else newline + 1
+        if stop - start > max_bytes:
+            if end == start:
+                # a single line longer than max_bytes is cut rather than skipped
+                return buffer[start : start + max_bytes], start_line - 1, True
+            break
+        end = stop
+        last += 1
+
+    more = end < size and (end_line is None or last < end_line)
+    return buffer[start:end], last, more
+
+
+def read_lines(
+    path: str,
+    start_line: int = 1,
+    end_line: int | None = None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+) -> str:
+    """
+    Reads lines start_line..end_line (1-based, inclusive) of a file, at most max_bytes of
+    them, ending with a notice that says how to read on when the output was truncated.
+    """
+    start_line = max(1, start_line)
+    st = os.stat(path)
+    if st.st_size == 0:
+        return ""
+    if st.st_size > MMAP_THRESHOLD:
+        with open(path, "rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                chunk, last, more = _line_range(buffer, start_line, end_line, max_bytes)
+    else:
+        chunk, last, more = _line_range(
+            read_cache.get(path, st), start_line, end_line, max_bytes
+        )
+
+    text = chunk.decode("utf-8", errors="replace")
+    if not chunk and start_line > 1:
+        return f"[No content: the file has fewer than {start_line} lines]"
+    if not more:
+        return text
+    if last < start_line:
+        return (
+            f"{text}\n\n[Truncated: line {start_line} is longer than {max_bytes} bytes; "
+            f"pass a larger max_bytes to read all of it]"
+        )
+    return (
+        f"{text}\n\n[Truncated: showed lines {start_line}-{last}; "
+        f"call read_project_file with start_line={last + 1} to read on]"
+    )
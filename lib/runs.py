@@ -0,0 +1,146 @@
+import json
+import logging
+import os
+import sqlite3
+import uuid
+from hashlib import sha256
+from threading import Lock
+from langgraph.checkpoint.sqlite import SqliteSaver
+from lib.ledger import STATE_DIR
+
+
+class GenerationRun:
+    """
+    Persisted progress of one generation run of a project, in .unlovable/run.json: the plan,
+    whether the scaffold is in place, which plan tasks finished, the prompt hashes the run
+    started from and, for an incremental run, the routes being regenerated. Planner and
+    task graphs are checkpointed to .unlovable/checkpoints.sqlite under thread ids scoped
+    to the run, so a resumed run skips finished tasks and continues interrupted ones from
+    their last step.
+    """
+
+    def __init__(self, project: str, data: dict):
+        self.project = project
+        self.path = os.path.join(project, STATE_DIR, "run.json")
+        self.id: str = data.get("id") or uuid.uuid4().hex
+        self.plan: dict | None = data.get("plan")
+        self.scaffolded: bool = data.get("scaffolded", False)
+        self.completed: list[str] = data.get("completed", [])
+        self.status: str = data.get("status", "running")
+        self.prompt_hashes: dict[str, str] | None = data.get("prompt_hashes")
+        self.routes: list[str] | None = data.get("routes")
+        # task key -> number of failed attempts, each retry gets a fresh checkpoint thread
+        self.attempts: dict[str, int] = data.get("attempts", {})
+        self._lock = Lock()
+        self._checkpointer: SqliteSaver | None = None
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = {
+            "id": self.id,
+            "plan": self.plan,
+            "scaffolded": self.scaffolded,
+            "completed": self.completed,
+            "status": self.status,
+            "prompt_hashes": self.prompt_hashes,
+            "routes": self.routes,
+            "attempts": self.attempts,
+        }
+        # write then rename so a crash never leaves a half-written record
+        with open(f"{self.path}.tmp", "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=2)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def update(self, **fields) -> None:
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.save()
+
+    @staticmethod
+    def task_key(phase: str, index: int, description: str) -> str:
+        return sha256(f"{phase}\0{index}\0{description}".encode()).hexdigest()[:16]
+
+    def is_completed(self, key: str) -> bool:
+        with self._lock:
+            return key in self.completed
+
+    def complete(self, key: str) -> None:
+        with self._lock:
+            if key not in self.completed:
+                self.completed.append(key)
+            self.save()
+
+    def attempt(self, key: str) -> int:
+        with self._lock:
+            return self.attempts.get(key, 0)
+
+    def retry(self, key: str) -> None:
+        with self._lock:
+            self.attempts[key] = self.attempts.get(key, 0) + 1
+            self.save()
+
+    @property
+    def checkpointer(self) -> SqliteSaver:
+        with self._lock:
+            if self._checkpointer is None:
+                path = os.path.join(self.project, STATE_DIR, "checkpoints.sqlite")
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self._checkpointer = SqliteSaver(
+                    sqlite3.connect(path, check_same_thread=False)
+                )
+            return self._checkpointer
+
+    def checkpointed(self, graph):
+        """A copy of a compiled graph that checkpoints to this project."""
+        return graph.copy(update={"checkpointer": self.checkpointer})
+
+    def config(self, thread: str) -> dict:
+        return {"configurable": {"thread_id": f"{self.id}:{thread}"}}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._checkpointer is not None:
+                self._checkpointer.conn.close()
+                self._checkpointer = None
+
+
+_runs: dict[str, GenerationRun] = {}
+_runs_lock = Lock()
+
+
+def start_run(project: str, scaffolded: bool) -> GenerationRun:
+    """Starts a new run of project, replacing any earlier run record."""
+    run = GenerationRun(project, {"scaffolded": scaffolded})
+    run.save()
+    with _runs_lock:
+        previous = _runs.pop(project, None)
+        _runs[project] = run
+    if previous is not None:
+        previous.close()
+    return run
+
+
+def load_run(project: str) -> GenerationRun | None:
+    """The project's last run, or None if it was never generated or the record is unreadable."""
+    with _runs_lock:
+        if project in _runs:
+            return _runs[project]
+    path = os.path.join(project, STATE_DIR, "run.json")
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            run = GenerationRun(project, json.load(file))
+    except (OSError, ValueError) as e:
+        logging.error(f"Ignoring unreadable run record {path}: {e}")
+        return None
+    with _runs_lock:
+        return _runs.setdefault(project, run)
+
+
+def close_run(project: str) -> None:
+    with _runs_lock:
+        run = _runs.pop(project, None)
+    if run is not None:
+        run.close()
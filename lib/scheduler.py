@@ -0,0 +1,80 @@
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import TYPE_CHECKING, Callable, TypeVar
+
+if TYPE_CHECKING:
+    from graphs.planner import PlanTask
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def paths_overlap(a: str, b: str) -> bool:
+    """True when one project path is the other or lies inside it."""
+    a = a.strip().strip("/")
+    b = b.strip().strip("/")
+    if not a or not b:
+        return True
+    return a == b or a.startswith(b + "/") or b.startswith(a + "/")
+
+
+def tasks_conflict(a: "PlanTask", b: "PlanTask") -> bool:
+    """
+    Two plan tasks conflict when either one writes a path the other reads or writes.
+    Tasks that declare no paths at all are treated as touching everything.
+    """
+    if not (a.reads or a.writes) or not (b.reads or b.writes):
+        return True
+
+    def writes_into(writer: "PlanTask", other: "PlanTask") -> bool:
+        return any(
+            paths_overlap(w, p)
+            for w in writer.writes
+            for p in other.reads + other.writes
+        )
+
+    return writes_into(a, b) or writes_into(b, a)
+
+
+def run_scheduled(
+    items: list[T],
+    run: Callable[[T], R],
+    conflicts: Callable[[T, T], bool],
+    max_workers: int,
+) -> list[R]:
+    """
+    Runs items on up to max_workers threads. An item only starts once every earlier
+    item it conflicts with has finished, so conflicting items keep their list order.
+    Results are returned in input order. The first exception stops new items from
+    starting and is re-raised once the running ones finish.
+    """
+    deps = [
+        {j for j in range(i) if conflicts(items[j], items[i])}
+        for i in range(len(items))
+    ]
+    results: list[R | None] = [None] * len(items)
+    started: set[int] = set()
+    finished: set[int] = set()
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        running = {}
+
+        def launch():
+            for i in range(len(items)):
+                if len(running) >= max(1, max_workers):
+                    return
+                if i not in started and deps[i] <= finished:
+                    started.add(i)
+                    # each item gets its own copy of the caller's context (current project etc.)
+                    running[executor.submit(copy_context().run, run, items[i])] = i
+
+        launch()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                results[i] = future.result()
+                finished.add(i)
+            launch()
+
+    return results
@@ -0,0 +1,125 @@
+import logging
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import Future
+from threading import Lock
+from typing import Protocol
+
+
+class SearchBackend(Protocol):
+    def run(self, query: str) -> str: ...
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: case, punctuation and spacing differences are ignored."""
+    query = re.sub(r"[^\w\s.+#@/-]", " ", query.casefold())
+    return " ".join(word.strip(".") for word in query.split() if word.strip("."))
+
+
+class SearchCache:
+    """
+    Disk-backed cache in front of a search backend (anything with run(query) -> str, e.g.
+    GoogleSerperAPIWrapper). Entries expire after ttl seconds and the least recently used
+    ones are evicted past max_entries. Concurrent identical queries share one backend call.
+    """
+
+    def __init__(
+        self,
+        backend: SearchBackend,
+        path: str,
+        ttl: float = 7 * 24 * 3600,
+        max_entries: int = 5000,
+    ):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = Lock()
+        self._inflight: dict[str, Future] = {}
+        self._counters = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS searches ("
+            "key TEXT PRIMARY KEY, result TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS searches_accessed ON searches (accessed)"
+        )
+        self._db.commit()
+
+    def run(self, query: str) -> str:
+        key = normalize_query(query)
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                self._counters["hits"] += 1
+                return cached
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                self._counters["misses"] += 1
+                future = self._inflight[key] = Future()
+            else:
+                self._counters["coalesced"] += 1
+        if pending is not None:
+            return pending.result()
+
+        try:
+            result = self.backend.run(query)
+        except Exception as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._store(key, result)
+            del self._inflight[key]
+        future.set_result(result)
+        return result
+
+    def _lookup(self, key: str) -> str | None:
+        row = self._db.execute(
+            "SELECT result, created FROM searches WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        result, created = row
+        now = time.time()
+        if now - created > self.ttl:
+            self._db.execute("DELETE FROM searches WHERE key = ?", (key,))
+            self._db.commit()
+            return None
+        self._db.execute("UPDATE searches SET accessed = ? WHERE key = ?", (now, key))
+        self._db.commit()
+        return result
+
+    def _store(self, key: str, result: str) -> None:
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO searches (key, result, created, accessed) VALUES (?, ?, ?, ?)",
+            (key, result, now, now),
+        )
+        (count,) = self._db.execute("SELECT COUNT(*) FROM searches").fetchone()
+        if count > self.max_entries:
+            self._db.execute(
+                "DELETE FROM searches WHERE key IN (SELECT key FROM searches ORDER BY accessed LIMIT ?)",
+                (count - self.max_entries,),
+            )
+            self._counters["evictions"] += count - self.max_entries
+        self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM searches")
+            self._db.commit()
+        logging.info("Search cache cleared")
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            (entries,) = self._db.execute("SELECT COUNT(*) FROM searches").fetchone()
+            return {**self._counters, "entries": entries}
@@ -2,12 +2,30 @@ import uvicorn
 import logging
 import os
 import time
-from fastapi import FastAPI, Response
+from fastapi import FastAPI, Query, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette import status
-from lib.project import generate_project, project_dev_server, revert_project
+from lib.project import generate_project, revert_project, sync_restored
+from lib.dev_servers import dev_servers
+from lib.template import ensure_template, refresh_template
+from lib.store import prune_store, store_stats
+from lib.read_cache import read_cache
+from lib.checkers import shutdown_checkers
+from lib.runs import close_run, load_run
+from lib.snapshots import list_snapshots, restore_snapshot
+from graphs.compaction import compaction_stats
+from lib.jobs import (
+    LIVE_STAGES,
+    Job,
+    JobCancelled,
+    create_job_if_idle,
+    get_job,
+    list_jobs,
+    sse_format,
+)
 from contextlib import asynccontextmanager
-from globals import app_state
+from globals import app_state, use_project
 from concurrent.futures import ThreadPoolExecutor
 from pydantic import BaseModel
 from langchain_ollama import ChatOllama
@@ -34,26 +52,243 @@ app.add_middleware(
 )
 
 
+def run_job(job: Job, resume: bool = False, incremental: bool = False):
+    with use_project(job.path):
+        try:
+            run_project_job(job, resume, incremental)
+        finally:
+            shutdown_checkers(job.path)
+            close_run(job.path)
+
+
+def set_run_status(path: str, status: str) -> None:
+    run = load_run(path)
+    if run is not None:
+        run.update(status=status)
+
+
+# a failed or cancelled run keeps its files, plan and checkpoints so it can be resumed
+def run_project_job(job: Job, resume: bool = False, incremental: bool = False):
+    if job.cancelled:
+        job.set_status("cancelled")
+        return
+
+    job.set_status("running")
+    try:
+        generate_project(job, resume, incremental)
+    except JobCancelled:
+        set_run_status(job.path, "cancelled")
+        job.set_status("cancelled")
+        return
+    except Exception as e:
+        logging.error(f"Project generation failed with: {str(e)}")
+        set_run_status(job.path, "failed")
+        job.set_status("failed", f"Project generation failed with: {str(e)}")
+        return
+
+    server = dev_servers.ensure(job.path)
+    job.emit(
+        "dev_server", f"Starting dev server on port {server.port}...", port=server.port
+    )
+    if not server.wait_ready():
+        job.emit("dev_server", "Dev server did not start", state="failed")
+        job.set_status("succeeded")
+        return
+    job.set_status("succeeded", url=server.url)
+
+
+def active_job(path: str) -> Job | None:
+    return next((job for job in list_jobs() if job.path == path and not job.done), None)
+
+
+# incremental regenerates only the routes whose prompts changed since the last success
 @app.post("/api/generate_project")
-def post_generate_project(path: str):
+def post_generate_project(path: str, incremental: bool = False):
+    global thread_executor
+
+    job = create_job_if_idle(path)
+    if job is None:
+        return Response(
+            content="Project is already being generated",
+            status_code=status.HTTP_409_CONFLICT,
+        )
+    thread_executor.submit(run_job, job, False, incremental)
+    return JSONResponse(
+        content={"job_id": job.id}, status_code=status.HTTP_202_ACCEPTED
+    )
+
+
+@app.post("/api/resume_project")
+def post_resume_project(path: str):
     global thread_executor
 
-    with app_state._lock:
-        app_state.current_project = path
+    if active_job(path):
+        return Response(
+            content="Project is already being generated",
+            status_code=status.HTTP_409_CONFLICT,
+        )
+    run = load_run(path)
+    if run is None or run.status == "succeeded":
+        return Response(
+            content="Project has no unfinished generation run",
+            status_code=status.HTTP_409_CONFLICT,
+        )
+    job = create_job_if_idle(path)
+    if job is None:
+        return Response(
+            content="Project is already being generated",
+            status_code=status.HTTP_409_CONFLICT,
+        )
+    thread_executor.submit(run_job, job, True)
+    return JSONResponse(
+        content={"job_id": job.id}, status_code=status.HTTP_202_ACCEPTED
+    )
+
+
+# deletes everything generated and moves the prompt folders back
+@app.post("/api/revert_project")
+def post_revert_project(path: str):
+    if active_job(path):
+        return Response(
+            content="Project is being generated",
+            status_code=status.HTTP_409_CONFLICT,
+        )
+    if not os.path.isdir(os.path.join(path, "prompts")):
+        return Response(
+            content="Project has not been generated",
+            status_code=status.HTTP_409_CONFLICT,
+        )
+    with use_project(path):
+        error = revert_project()
+    if error:
+        return Response(
+            content=error, status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    return Response(status_code=status.HTTP_200_OK)
+
 
+@app.get("/api/jobs")
+def get_jobs():
+    return [job.snapshot() for job in list_jobs()]
+
+
+@app.get("/api/jobs/{job_id}")
+def get_job_status(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        return Response(content="Job not found", status_code=status.HTTP_404_NOT_FOUND)
+    return job.snapshot()
+
+
+# live=false leaves out the streamed model tokens and tool calls
+@app.get("/api/jobs/{job_id}/events")
+def get_job_events(job_id: str, since: int = 0, live: bool = True):
+    job = get_job(job_id)
+    if job is None:
+        return Response(content="Job not found", status_code=status.HTTP_404_NOT_FOUND)
+    return StreamingResponse(
+        (
+            sse_format(event)
+            for event in job.follow(since)
+            if live or event is None or event["stage"] not in LIVE_STAGES
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@app.post("/api/jobs/{job_id}/cancel")
+def post_cancel_job(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        return Response(content="Job not found", status_code=status.HTTP_404_NOT_FOUND)
+    job.cancel()
+    return Response(status_code=status.HTTP_202_ACCEPTED)
+
+
+@app.post("/api/template/refresh")
+def post_refresh_template():
+    global thread_executor
+
+    thread_executor.submit(refresh_template)
+    return Response(status_code=status.HTTP_202_ACCEPTED)
+
+
+@app.get("/api/snapshots")
+def get_snapshots(path: str):
+    return list_snapshots(path)
+
+
+# paths limits the restore to those files or directories (relative to the project root)
+@app.post("/api/snapshots/{snapshot_id}/restore")
+def post_restore_snapshot(
+    snapshot_id: str, path: str, paths: list[str] | None = Query(None)
+):
+    if active_job(path):
+        return Response(
+            content="Project is being generated",
+            status_code=status.HTTP_409_CONFLICT,
+        )
     try:
-        generate_project()
-    except RuntimeError as e:
-        thread_executor.submit(revert_project)
+        changed = restore_snapshot(path, snapshot_id, paths)
+    except FileNotFoundError:
         return Response(
-            content=f"Project generation failed with: {str(e)}",
-            status_code=status.HTTP_400_BAD_REQUEST,
+            content="Snapshot not found", status_code=status.HTTP_404_NOT_FOUND
         )
+    sync_restored(path, changed)
+    return {"restored": changed}
 
-    thread_executor.submit(project_dev_server)
+
+@app.get("/api/dev_servers")
+def get_dev_servers():
+    return dev_servers.list()
+
+
+# starts the project's dev server if it is not running
+@app.post("/api/dev_servers/restart")
+def post_restart_dev_server(path: str):
+    if not os.path.isdir(path):
+        return Response(
+            content="Project not found", status_code=status.HTTP_404_NOT_FOUND
+        )
+    try:
+        server = dev_servers.restart(path)
+    except RuntimeError as e:
+        return Response(content=str(e), status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return JSONResponse(content=server.info(), status_code=status.HTTP_202_ACCEPTED)
+
+
+@app.post("/api/dev_servers/stop")
+def post_stop_dev_server(path: str):
+    if not dev_servers.stop(path):
+        return Response(
+            content="No dev server for this project",
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
     return Response(status_code=status.HTTP_200_OK)
 
 
+@app.get("/api/stats")
+def get_stats():
+    return {
+        "search_cache": app_state.search.stats(),
+        "llm_cache": app_state.llm_cache.stats() if app_state.llm_cache else None,
+        "context_compaction": compaction_stats(),
+        "read_cache": read_cache.stats(),
+        "fix_memory": app_state.fix_memory.stats() if app_state.fix_memory else None,
+    }
+
+
+@app.get("/api/store")
+def get_store_stats():
+    return store_stats()
+
+
+@app.post("/api/store/prune")
+def post_prune_store():
+    return {"removed": prune_store()}
+
+
 class Model(BaseModel):
     provider: str
     model_string: str
@@ -71,14 +306,12 @@ def post_switch_model(model: Model):
         elif model.provider == "OpenAI":
             new_model = ChatOpenAI(model=model.model_string, temperature=0)
     except Exception as e:
-        revert_project()
         return Response(
             content=f"Switching models failed with: {str(e)}",
             status_code=status.HTTP_400_BAD_REQUEST,
         )
 
-    with app_state._lock:
-        app_state.model = new_model
+    app_state.set_model(new_model)
 
     return Response(status_code=status.HTTP_200_OK)
 
@@ -90,6 +323,8 @@ def post_quit():
     print()
     logging.info("Exiting unlovable...")
 
+    dev_servers.stop_all()
+
     def quit():
         time.sleep(0.1)
         os._exit(0)
@@ -101,6 +336,8 @@ def post_quit():
 def serve(executor: ThreadPoolExecutor):
     global thread_executor
     thread_executor = executor
+    # warm the scaffold template so the first project does not wait on create-next-app
+    thread_executor.submit(ensure_template)
     uvicorn.run(
         "lib.server:app",
         host="127.0.0.1",
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import stat
+import time
+from threading import Lock
+from lib.ledger import STATE_DIR
+from lib.scheduler import paths_overlap
+
+# never part of a snapshot: installed packages, build output, generator state and prompts
+EXCLUDED_DIRS = {"node_modules", ".next", ".git", STATE_DIR, "prompts"}
+# older snapshots are dropped (and blobs only they used deleted) past this many
+MAX_SNAPSHOTS = int(os.getenv("UNLOVABLE_MAX_SNAPSHOTS", "200"))
+
+_locks: dict[str, Lock] = {}
+# project -> rel path -> (size, mtime_ns, sha256), so unchanged files are not re-hashed
+_hash_cache: dict[str, dict[str, tuple[int, int, str]]] = {}
+_registry_lock = Lock()
+
+
+def _snapshot_dir(project: str) -> str:
+    return os.path.join(project, STATE_DIR, "snapshots")
+
+
+def _blob_path(project: str, key: str) -> str:
+    return os.path.join(_snapshot_dir(project), "objects", key[:2], key)
+
+
+def _manifest_path(project: str, snapshot_id: str) -> str:
+    return os.path.join(_snapshot_dir(project), f"{snapshot_id}.json")
+
+
+def _lock(project: str) -> Lock:
+    with _registry_lock:
+        return _locks.setdefault(project, Lock())
+
+
+def _source_files(project: str) -> dict[str, os.stat_result]:
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(project):
+        if dirpath == project:
+            dirnames[:] = [d for d in dirnames if d not in EXCLUDED_DIRS]
+        else:
+            dirnames[:] = [d for d in dirnames if d not in ("node_modules", ".next")]
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            st = os.lstat(path)
+            if stat.S_ISREG(st.st_mode):
+                rel_path = os.path.relpath(path, project).replace(os.sep, "/")
+                files[rel_path] = st
+    return files
+
+
+def _file_hash(project: str, rel_path: str, st: os.stat_result) -> str:
+    cache = _hash_cache.setdefault(project, {})
+    cached = cache.get(rel_path)
+    if cached and cached[:2] == (st.st_size, st.st_mtime_ns):
+        return cached[2]
+    with open(os.path.join(project, rel_path), "rb") as file:
+        digest = hashlib.file_digest(file, "sha256").hexdigest()
+    cache[rel_path] = (st.st_size, st.st_mtime_ns, digest)
+    return digest
+
+
+def _write_atomic(path: str, source: str, mode: int) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.unlovable-tmp"
+    shutil.copyfile(source, tmp)
+    os.chmod(tmp, mode)
+    os.replace(tmp, path)
+
+
+def take_snapshot(project: str, label: str) -> str:
+    """
+    Records the project's source tree (everything but node_modules, .next, .git,
+    .unlovable and prompts) and returns the snapshot id. File contents are stored once
+    as content-addressed blobs, and files unchanged since the last snapshot are not
+    re-hashed, so a snapshot costs roughly one directory walk.
+    """
+    with _lock(project):
+        files = {}
+        for rel_path, st in _source_files(project).items():
+            key = _file_hash(project, rel_path, st)
+            blob = _blob_path(project, key)
+            if not os.path.exists(blob):
+                # blobs are copies, never links, since agents rewrite files in place
+                _write_atomic(blob, os.path.join(project, rel_path), 0o444)
+            files[rel_path] = {"sha": key, "mode": stat.S_IMODE(st.st_mode)}
+
+        snapshot_id = f"{time.time_ns():x}"
+        manifest = {
+            "id": snapshot_id,
+            "label": label,
+            "created": time.time(),
+            "files": files,
+        }
+        # an empty tree, or one whose blobs all exist, writes no blob to create the folder
+        os.makedirs(_snapshot_dir(project), exist_ok=True)
+        with open(_manifest_path(project, snapshot_id), "w", encoding="utf-8") as file:
+            json.dump(manifest, file)
+        _prune(project, MAX_SNAPSHOTS)
+    return snapshot_id
+
+
+def restore_snapshot(
+    project: str, snapshot_id: str, paths: list[str] | None = None
+) -> list[str]:
+    """
+    Puts the project's source files back to how they were in a snapshot, only rewriting
+    files whose content differs and deleting files the snapshot did not have.
+    With paths, only files at or under those paths are touched.
+    Returns the paths that changed. Raises FileNotFoundError for an unknown snapshot.
+    """
+    with _lock(project):
+        with open(_manifest_path(project, snapshot_id), "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+
+        def wanted(rel_path: str) -> bool:
+            return paths is None or any(paths_overlap(rel_path, p) for p in paths)
+
+        current = _source_files(project)
+        changed = []
+        for rel_path, entry in manifest["files"].items():
+            if not wanted(rel_path):
+                continue
+            st = current.get(rel_path)
+            if st is not None and _file_hash(project, rel_path, st) == entry["sha"]:
+                continue
+            target = os.path.join(project, rel_path)
+            _write_atomic(target, _blob_path(project, entry["sha"]), entry["mode"])
+            changed.append(rel_path)
+
+        for rel_path in current:
+            if rel_path not in manifest["files"] and wanted(rel_path):
+                os.remove(os.path.join(project, rel_path))
+                _hash_cache.get(project, {}).pop(rel_path, None)
+                changed.append(rel_path)
+
+    if changed:
+        logging.info(
+            f"Restored {len(changed)} files of {project} from snapshot {snapshot_id} ({manifest['label']})"
+        )
+    return changed
+
+
+def list_snapshots(project: str) -> list[dict]:
+    snapshots = []
+    directory = _snapshot_dir(project)
+    if not os.path.isdir(directory):
+        return snapshots
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            continue
+        snapshots.append(
+            {
+                "id": manifest["id"],
+                "label": manifest["label"],
+                "created": manifest["created"],
+                "files": len(manifest["files"]),
+            }
+        )
+    return snapshots
+
+
+def _prune(project: str, keep: int) -> None:
+    directory = _snapshot_dir(project)
+    manifests = sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+    if len(manifests) <= keep:
+        return
+    for name in manifests[: len(manifests) - keep]:
+        os.remove(os.path.join(directory, name))
+
+    used = set()
+    for name in manifests[len(manifests) - keep :]:
+        with open(os.path.join(directory, name), "r", encoding="utf-8") as file:
+            used.update(entry["sha"] for entry in json.load(file)["files"].values())
+    objects = os.path.join(directory, "objects")
+    for dirpath, _, filenames in os.walk(objects):
+        for name in filenames:
+            if name not in used:
+                os.remove(os.path.join(dirpath, name))
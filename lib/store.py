@@ -0,0 +1,129 @@
+import errno
+import hashlib
+import logging
+import os
+import shutil
+import stat
+from globals import CACHE_DIR
+
+# Content-addressed blobs shared by every generated project's node_modules.
+# A file that appears in N projects is stored once and hardlinked N times.
+STORE_DIR = os.path.join(CACHE_DIR, "store")
+
+
+def _blob_path(key: str) -> str:
+    return os.path.join(STORE_DIR, key[:2], key)
+
+
+def _blob_key(path: str, mode: int) -> str:
+    with open(path, "rb") as file:
+        digest = hashlib.file_digest(file, "sha256").hexdigest()
+    # executables keep their own blob so linking never changes a file's mode
+    return digest + ("-x" if mode & stat.S_IXUSR else "")
+
+
+def is_package_file(rel_path: str) -> bool:
+    """
+    True for a file inside a package directory of node_modules (rel_path is relative to
+    node_modules). Files directly in node_modules and dot-directories such as .cache or
+    .bin hold metadata that npm and tools rewrite in place, like the hidden lockfile
+    .package-lock.json, so they must never be shared between projects.
+    """
+    parts = rel_path.replace(os.sep, "/").split("/")
+    return len(parts) > 1 and not parts[0].startswith(".")
+
+
+def _unshare(path: str) -> None:
+    """Gives a hardlinked file its own copy, so in-place edits stay in this project."""
+    tmp = f"{path}.unlovable-copy"
+    shutil.copy2(path, tmp)
+    os.replace(tmp, path)
+
+
+def link_into_store(root: str) -> tuple[int, int]:
+    """
+    Replaces every regular file in a package directory under root (see is_package_file)
+    that is not shared yet with a hardlink to its blob in the store, adding new blobs as
+    needed. Files that already have more than one link are assumed to be shared and are
+    skipped, so warm calls only hash new files. Metadata files that were hardlinked
+    anyway (by older versions) get their own copy again.
+    Returns (files linked, bytes saved).
+    """
+    linked, saved = 0, 0
+    if not os.path.isdir(root):
+        return linked, saved
+
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.lstat(path)
+                if not stat.S_ISREG(st.st_mode):
+                    continue
+                if not is_package_file(os.path.relpath(path, root)):
+                    if st.st_nlink > 1:
+                        _unshare(path)
+                    continue
+                if st.st_nlink > 1:
+                    continue
+
+                blob = _blob_path(_blob_key(path, st.st_mode))
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                try:
+                    os.link(path, blob)
+                    continue
+                except FileExistsError:
+                    pass
+
+                tmp = f"{path}.unlovable-link"
+                os.link(blob, tmp)
+                os.replace(tmp, path)
+                linked += 1
+                saved += st.st_size
+            except OSError as e:
+                if e.errno == errno.EXDEV:
+                    logging.warning(
+                        f"Package store {STORE_DIR} is on a different filesystem than {root}, skipping"
+                    )
+                    return linked, saved
+                logging.error(f"Linking {path} into package store failed with: {e}")
+
+    return linked, saved
+
+
+def link_project_packages(project: str) -> str:
+    linked, saved = link_into_store(os.path.join(project, "node_modules"))
+    if linked:
+        logging.info(
+            f"Linked {linked} files of {project}/node_modules into the package store ({saved} bytes saved)"
+        )
+    return f"Linked {linked} files into the shared package store"
+
+
+def store_stats() -> dict[str, int]:
+    blobs, size, unused = 0, 0, 0
+    if os.path.isdir(STORE_DIR):
+        for dirpath, _, filenames in os.walk(STORE_DIR):
+            for name in filenames:
+                st = os.lstat(os.path.join(dirpath, name))
+                blobs += 1
+                size += st.st_size
+                unused += st.st_nlink == 1
+    return {"blobs": blobs, "bytes": size, "unused_blobs": unused}
+
+
+def prune_store() -> int:
+    """Deletes blobs that no project links to anymore. Returns the number removed."""
+    removed = 0
+    if not os.path.isdir(STORE_DIR):
+        return removed
+    for dirpath, _, filenames in os.walk(STORE_DIR):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                if os.lstat(path).st_nlink == 1:
+                    os.remove(path)
+                    removed += 1
+            except OSError as e:
+                logging.error(f"Pruning {path} failed with: {e}")
+    return removed
@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from functools import partial
+from hashlib import sha256
+from threading import Lock
+from globals import CACHE_DIR
+from lib.store import is_package_file, link_into_store
+
+CREATE_NEXT_APP_VERSION = os.getenv("UNLOVABLE_CREATE_NEXT_APP_VERSION", "latest")
+CREATE_NEXT_APP_FLAGS = "--yes --tailwind --eslint --src-dir --app --ts"
+TEMPLATE_NAME = "unlovable-template"
+
+# Held while the template is built, refreshed or copied so a refresh never races a copy
+_template_lock = Lock()
+
+
+def template_dir() -> str:
+    """Cache directory for the current create-next-app version and flag set."""
+    key = sha256(
+        f"{CREATE_NEXT_APP_VERSION} {CREATE_NEXT_APP_FLAGS}".encode()
+    ).hexdigest()[:12]
+    return os.path.join(CACHE_DIR, "templates", f"next-{CREATE_NEXT_APP_VERSION}-{key}")
+
+
+def _build_template() -> str:
+    target = template_dir()
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=os.path.dirname(target))
+    try:
+        env = os.environ.copy()
+        env["CI"] = "1"
+        logging.info(f"Scaffolding Next.js template into {target}")
+        subprocess.run(
+            f"npx create-next-app@{CREATE_NEXT_APP_VERSION} {TEMPLATE_NAME} {CREATE_NEXT_APP_FLAGS}",
+            capture_output=True,
+            text=True,
+            cwd=staging,
+            shell=True,
+            check=True,
+            env=env,
+        )
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.replace(os.path.join(staging, TEMPLATE_NAME), target)
+        link_into_store(os.path.join(target, "node_modules"))
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return target
+
+
+def ensure_template() -> str:
+    """Returns the cached template, scaffolding it first if it does not exist yet."""
+    with _template_lock:
+        if os.path.isdir(template_dir()):
+            return template_dir()
+        return _build_template()
+
+
+def refresh_template() -> str:
+    """Re-runs create-next-app and replaces the cached template."""
+    with _template_lock:
+        return _build_template()
+
+
+def package_name(project: str) -> str:
+    """npm-safe package name derived from the project folder name."""
+    name = re.sub(r"[^a-z0-9._~-]+", "-", os.path.basename(project).lower())
+    return name.strip("-._") or "unlovable-site"
+
+
+def _link_or_copy(root: str, src: str, dst: str) -> None:
+    """Hardlinks a package file of the node_modules at root, copies anything else."""
+    if os.path.lexists(dst):
+        os.remove(dst)
+    if is_package_file(os.path.relpath(src, root)):
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+
+
+def copy_template(project: str) -> None:
+    """
+    Creates a new Next.js project in place from the cached template.
+    Files inside node_modules packages are hardlinked, sharing the template's package
+    store blobs, since npm replaces package files rather than editing them. node_modules
+    metadata npm does edit in place (the hidden lockfile .package-lock.json, .cache) and
+    everything outside node_modules are copied.
+    Copying again over a partial copy (e.g. after a crash) is safe.
+    Raises subprocess.CalledProcessError if the template has to be scaffolded and that fails.
+    """
+    template = ensure_template()
+    with _template_lock:
+        for item in os.listdir(template):
+            src = os.path.join(template, item)
+            dst = os.path.join(project, item)
+            if item == "node_modules":
+                shutil.copytree(
+                    src,
+                    dst,
+                    symlinks=True,
+                    copy_function=partial(_link_or_copy, src),
+                    dirs_exist_ok=True,
+                )
+            elif os.path.isdir(src):
+                shutil.copytree(src, dst, symlinks=True, dirs_exist_ok=True)
+            else:
+                shutil.copy2(src, dst)
+
+    name = package_name(project)
+    for manifest in ("package.json", "package-lock.json"):
+        path = os.path.join(project, manifest)
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        data["name"] = name
+        if "" in data.get("packages", {}):
+            data["packages"][""]["name"] = name
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=2)
+            file.write("\n")
+
+    # generation state (change ledger, run record, checkpoints) is kept out of the site's history
+    gitignore = os.path.join(project, ".gitignore")
+    with open(gitignore, "a+", encoding="utf-8") as file:
+        file.seek(0)
+        if "/.unlovable" not in file.read().split("\n"):
+            file.write("\n/.unlovable\n")
@@ -1,5 +1,6 @@
 from lib.server import serve
 from lib.landing import launch_app
+from lib.dev_servers import dev_servers
 from concurrent.futures import ThreadPoolExecutor
 from logging.handlers import RotatingFileHandler
 import logging
@@ -23,6 +24,7 @@ if __name__ == "__main__":
         print()
         logging.info("Exiting unlovable...")
         shutdown_requested[0] = True
+        dev_servers.stop_all()
         os._exit(0)
 
     signal.signal(signal.SIGINT, interrupt_handler)
@@ -36,4 +38,5 @@ if __name__ == "__main__":
                 time.sleep(0.1)
         except KeyboardInterrupt:
             logging.info("Exiting unlovable...")
+            dev_servers.stop_all()
             os._exit(0)
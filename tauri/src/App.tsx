@@ -38,18 +38,27 @@ import { getCurrentWindow } from "@tauri-apps/api/window";
 import { Store } from "@tauri-apps/plugin-store";
 import "./App.css";
 
-// TODO: wait VERY LONG for generation
+// how much streamed output is kept per agent, and how many agents are shown at once
+const LIVE_OUTPUT_CHARS = 1500;
+const LIVE_OUTPUT_SOURCES = 3;
+
+type LiveOutput = { source: string; text: string };
+
 export default function UnlovableLanding() {
   const [showPopup, setShowPopup] = useState(false);
   const [showInstructions, setShowInstructions] = useState(false);
   const [projectOpenSuccess, setProjectOpenSuccess] = useState(false);
   const [openingProject, setOpeningProject] = useState(false);
+  const [jobId, setJobId] = useState("");
+  const [progress, setProgress] = useState("");
+  const [liveOutput, setLiveOutput] = useState<LiveOutput[]>([]);
   const [showSettings, setShowSettings] = useState(false);
   const [selectedProvider, setSelectedProvider] = useState("Ollama");
   const [modelString, setModelString] = useState("");
   const [tempProvider, setTempProvider] = useState("Ollama");
   const [tempModelString, setTempModelString] = useState("");
   const [error, setError] = useState("");
+  const [resumablePath, setResumablePath] = useState("");
   const [settingsError, setSettingsError] = useState("");
   const [isLoading, setIsLoading] = useState(true);
 
@@ -114,37 +123,72 @@ export default function UnlovableLanding() {
     };
   }, [projectOpenSuccess]);
   async function handleOpenButton() {
+    const dir = await dirOpen({
+      directory: true,
+      multiple: false,
+    });
+
+    if (!dir) {
+      return;
+    }
+
+    // a project generated before only regenerates the routes whose prompts changed
+    await runProjectJob("generate_project", dir, "&incremental=true");
+  }
+
+  // Continues a failed or cancelled run from its last completed task
+  async function handleResumeButton() {
+    await runProjectJob("resume_project", resumablePath, "");
+  }
+
+  async function runProjectJob(endpoint: string, dir: string, query: string) {
     setError("");
+    setResumablePath("");
     setProjectOpenSuccess(false);
 
     try {
-      const dir = await dirOpen({
-        directory: true,
-        multiple: false,
-      });
-
-      if (!dir) {
-        return;
-      }
-
       setOpeningProject(true);
+      setProgress("");
+      setLiveOutput([]);
 
       const response = await fetch(
-        `http://localhost:8000/api/generate_project?path=${encodeURIComponent(dir)}`,
+        `http://localhost:8000/api/${endpoint}?path=${encodeURIComponent(dir)}${query}`,
         {
           method: "POST",
         },
       );
 
-      if (response.ok) {
+      if (!response.ok) {
+        const errorText = await response.text();
+        setError(errorText || "Failed to generate project. Please try again.");
+        setOpeningProject(false);
+        setProjectOpenSuccess(false);
+        return;
+      }
+
+      const { job_id } = await response.json();
+      setJobId(job_id);
+      const job = await followJob(job_id);
+
+      if (job.status === "succeeded" && job.url) {
         setProjectOpenSuccess(true);
         setOpeningProject(false);
         await new Promise((resolve) => setTimeout(resolve, 500));
-        await open("http://localhost:3000");
+        await open(job.url);
         await getCurrentWindow().close();
+      } else if (job.status === "succeeded") {
+        setError(
+          "The project was generated, but its dev server did not start. Run npm run dev in the project folder to preview it.",
+        );
+        setOpeningProject(false);
+        setProjectOpenSuccess(false);
       } else {
-        const errorText = await response.text();
-        setError(errorText || "Failed to generate project. Please try again.");
+        setError(
+          job.status === "cancelled"
+            ? "Generation was cancelled."
+            : job.error || "Failed to generate project. Please try again.",
+        );
+        setResumablePath(dir);
         setOpeningProject(false);
         setProjectOpenSuccess(false);
       }
@@ -153,7 +197,82 @@ export default function UnlovableLanding() {
       setProjectOpenSuccess(false);
       setError("An error occurred. Please try again.");
       console.error("Error opening project:", err);
+    } finally {
+      setJobId("");
+    }
+  }
+
+  // Appends streamed text to an agent's output, most recently active agent first
+  function appendLiveOutput(source: string, text: string) {
+    setLiveOutput((outputs) => {
+      const previous = outputs.find((output) => output.source === source);
+      const updated = {
+        source,
+        text: ((previous?.text ?? "") + text).slice(-LIVE_OUTPUT_CHARS),
+      };
+      return [
+        updated,
+        ...outputs.filter((output) => output.source !== source),
+      ].slice(0, LIVE_OUTPUT_SOURCES);
+    });
+  }
+
+  // Reads the job's server-sent events until it reaches a final status
+  async function followJob(
+    id: string,
+  ): Promise<{ status: string; error?: string; url?: string }> {
+    const response = await fetch(
+      `http://localhost:8000/api/jobs/${id}/events`,
+    );
+    if (!response.ok || !response.body) {
+      throw new Error(await response.text());
     }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let final = { status: "failed", error: "Lost connection to generator" };
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      const messages = buffer.split("\n\n");
+      buffer = messages.pop() ?? "";
+      for (const message of messages) {
+        const data = message
+          .split("\n")
+          .find((line) => line.startsWith("data: "));
+        if (!data) continue;
+
+        const event = JSON.parse(data.slice(6));
+        if (event.stage === "status") {
+          if (["succeeded", "failed", "cancelled"].includes(event.status)) {
+            final = event;
+          }
+        } else if (event.stage === "token") {
+          appendLiveOutput(event.source, event.message);
+        } else if (event.stage === "tool_call") {
+          const args = Object.values(event.args ?? {}).join(", ");
+          appendLiveOutput(
+            event.source,
+            `\n→ ${event.message}(${args.slice(0, 120)})\n`,
+          );
+        } else {
+          setProgress(event.message);
+        }
+      }
+    }
+
+    return final;
+  }
+
+  async function cancelJob() {
+    if (!jobId) return;
+    await fetch(`http://localhost:8000/api/jobs/${jobId}/cancel`, {
+      method: "POST",
+    }).catch(() => {});
   }
 
   function handleNewProject() {
@@ -161,9 +280,11 @@ export default function UnlovableLanding() {
   }
 
   function closePopup() {
+    cancelJob();
     setShowPopup(false);
     setShowInstructions(false);
     setError("");
+    setResumablePath("");
     setProjectOpenSuccess(false);
     setOpeningProject(false);
   }
@@ -464,9 +585,19 @@ export default function UnlovableLanding() {
                                 size={20}
                                 className="text-red-400 shrink-0 mt-0.5"
                               />
-                              <p className="text-red-400 text-sm font-sans">
-                                {error}
-                              </p>
+                              <div className="flex-1">
+                                <p className="text-red-400 text-sm font-sans">
+                                  {error}
+                                </p>
+                                {resumablePath && (
+                                  <button
+                                    onClick={handleResumeButton}
+                                    className="mt-2 text-sm font-semibold text-white underline font-sans"
+                                  >
+                                    Resume from the last completed task
+                                  </button>
+                                )}
+                              </div>
                             </motion.div>
                           )}
 
@@ -507,7 +638,7 @@ export default function UnlovableLanding() {
                                       Generating Project...
                                     </h3>
                                     <p className="text-sm text-slate-400 font-sans">
-                                      This may take a moment
+                                      {progress || "This may take a moment"}
                                     </p>
                                   </div>
                                 </>
@@ -525,6 +656,23 @@ export default function UnlovableLanding() {
                                 </>
                               )}
                             </button>
+                            {openingProject && liveOutput.length > 0 && (
+                              <div className="w-full space-y-2">
+                                {liveOutput.map((output) => (
+                                  <div
+                                    key={output.source}
+                                    className="p-3 rounded-xl bg-black/40 border border-white/10 text-left"
+                                  >
+                                    <p className="text-xs font-semibold text-slate-300 font-sans truncate">
+                                      {output.source}
+                                    </p>
+                                    <pre className="mt-1 max-h-32 overflow-hidden text-xs text-slate-400 whitespace-pre-wrap break-words flex flex-col-reverse">
+                                      <span>{output.text}</span>
+                                    </pre>
+                                  </div>
+                                ))}
+                              </div>
+                            )}
                             <button
                               onClick={handleNewProject}
                               disabled={openingProject}